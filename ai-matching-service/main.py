@@ -76,10 +76,13 @@ async def lifespan(app: FastAPI):
     
     # Initialize metrics collector
     metrics_collector = MetricsCollector()
+    await metrics_collector.initialize()
     
     # Initialize AI matching engines
     logger.info("🧠 Loading AI models...")
-    tensorflow_engine = TensorFlowMatchingEngine()
+    tensorflow_engine = TensorFlowMatchingEngine(
+        candidate_loader=database_manager.iter_matching_candidates
+    )
     nlp_engine = NLPNameLocationMatcher()
     graph_engine = FamilyGraphMatcher()
     genetic_engine = GeneticAnalyzer()
@@ -107,6 +110,9 @@ async def lifespan(app: FastAPI):
         await database_manager.close()
     if cache_manager:
         await cache_manager.close()
+    if metrics_collector:
+        await metrics_collector.close()
+    await tensorflow_engine.close()
     logger.info("✅ Cleanup complete")
 
 # Initialize FastAPI app
@@ -367,5 +373,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        workers=1
+        workers=1,
+        loop="uvloop"
     )
\ No newline at end of file
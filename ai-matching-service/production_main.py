@@ -171,8 +171,14 @@ async def find_matches(
     logger.info(f"🔍 Finding matches for user: {request.user_id}")
     
     try:
-        # Get all users from database
-        all_users = await db.get_all_users()
+        # Target plus candidates, projected down to the matching fields server-side
+        target_user = await db.get_user_by_id(request.user_id)
+        # Exclude by the target's ObjectId when we have it, skipping a second hex parse
+        candidates = await db.get_matching_candidates(
+            exclude_user_id=target_user["_id"] if target_user else request.user_id,
+            sample_size=db.candidate_sample_size
+        )
+        all_users = ([target_user] if target_user else []) + candidates
         
         if not all_users:
             logger.warning("No users found in database")
@@ -241,7 +247,7 @@ async def batch_matches(
     
     try:
         # Get all users once
-        all_users = await db.get_all_users()
+        all_users = await db.get_matching_candidates()
         
         results = {}
         for user_id in request.user_ids:
@@ -291,7 +297,7 @@ async def calculate_similarity(
             raise HTTPException(status_code=404, detail="One or both users not found")
         
         # Calculate match
-        match_result = await engine.calculate_match(user1, user2)
+        match_result = engine.calculate_match(user1, user2)
         
         processing_time = int((time.time() - start_time) * 1000)
         
@@ -324,9 +330,8 @@ async def metrics():
 async def get_user_count(db: DatabaseManager = Depends(get_database)):
     """Get total count of users in database"""
     try:
-        users = await db.get_all_users()
         return {
-            "total_users": len(users),
+            "total_users": await db.count_active_users(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -346,5 +351,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         log_level="info",
-        access_log=True
+        access_log=True,
+        loop="uvloop"
     )
\ No newline at end of file
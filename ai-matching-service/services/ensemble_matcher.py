@@ -531,15 +531,17 @@ class EnsembleMatchingEngine:
             
             # TensorFlow similarity
             try:
-                tf_sim = await self.tensorflow_engine._calculate_neural_similarity(
-                    await self.tensorflow_engine._generate_user_embedding(
-                        self.tensorflow_engine._extract_features(profile_1)
-                    ),
-                    await self.tensorflow_engine._generate_user_embedding(
-                        self.tensorflow_engine._extract_features(profile_2)
-                    )
+                tf_engine = self.tensorflow_engine
+                embedding_1 = tf_engine._generate_user_embedding(
+                    tf_engine._extract_features(profile_1)
                 )
-                similarities["tensorflow"] = tf_sim
+                embedding_2 = tf_engine._generate_user_embedding(
+                    tf_engine._extract_features(profile_2)
+                )
+                tf_sim = tf_engine._cosine_similarities(
+                    embedding_1, tf_engine._normalize_embeddings(embedding_2)
+                )
+                similarities["tensorflow"] = float(tf_sim[0])
             except:
                 similarities["tensorflow"] = 0.0
             
@@ -15,29 +15,52 @@ Key Features:
 
 import logging
 import asyncio
+import threading
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, NamedTuple
 import re
-from dataclasses import dataclass
+import string
 
 # NLP libraries
 import spacy
-from fuzzywuzzy import fuzz, process
+import torch
+import jellyfish
+from rapidfuzz import fuzz
+from rapidfuzz.distance import Levenshtein
 from sentence_transformers import SentenceTransformer
 import nltk
 from nltk.corpus import wordnet
-from nltk.metrics.distance import edit_distance
+
+# Optional ANN index for large candidate sets
+try:
+    import faiss
+except ImportError:
+    faiss = None
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class NameVariation:
-    """Represents a name variation with cultural context."""
-    original: str
-    variation: str
-    culture: str
-    confidence: float
-    source: str  # "historical", "cultural", "phonetic"
+# SentenceTransformer models shared by every matcher in the process
+_BERT_MODELS: Dict[str, SentenceTransformer] = {}
+_bert_model_lock = threading.Lock()
+
+def get_shared_bert_model(model_name: str) -> SentenceTransformer:
+    """Load a SentenceTransformer once per process, in eval mode (fp16 on GPU)."""
+    with _bert_model_lock:
+        model = _BERT_MODELS.get(model_name)
+        if model is None:
+            model = SentenceTransformer(model_name).eval()
+            if torch.cuda.is_available():
+                model.half()
+            _BERT_MODELS[model_name] = model
+        return model
+
+class ScoreBreakdown(NamedTuple):
+    """Overall NLP similarity together with the sub-scores it was built from."""
+    overall: float
+    name: float
+    location: float
+    cultural: float
+    semantic: float
 
 class CulturalNameAnalyzer:
     """
@@ -53,6 +76,16 @@ class CulturalNameAnalyzer:
         self.cultural_patterns = self._load_cultural_patterns()
         self.historical_mappings = self._load_historical_mappings()
         
+        # (name, culture) -> {variation: confidence}, see get_variation_lookup
+        self._variation_cache: Dict[Tuple[str, Optional[str]], Dict[str, float]] = {}
+        self.max_cached_names = 100000
+    
+    def reload_patterns(self):
+        """Reload naming data in place and drop variations derived from the old data."""
+        self.cultural_patterns = self._load_cultural_patterns()
+        self.historical_mappings = self._load_historical_mappings()
+        self._variation_cache.clear()
+    
     def _load_cultural_patterns(self) -> Dict[str, List[Dict]]:
         """Load cultural naming patterns."""
         return {
@@ -84,9 +117,15 @@ class CulturalNameAnalyzer:
             "michael": ["mikhail", "miguel", "michele", "mike", "micky", "mick"]
         }
     
-    def find_name_variations(self, name: str, culture: Optional[str] = None) -> List[NameVariation]:
-        """Find all possible variations of a name."""
-        variations = []
+    def find_name_variations(self, name: str, culture: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find all possible variations of a name.
+        
+        Returns parallel arrays of variation strings and their confidences,
+        ordered cultural (0.9), historical (0.8), phonetic (0.6).
+        """
+        variations: List[str] = []
+        confidences: List[float] = []
         name_lower = name.lower()
         
         # Cultural pattern matching
@@ -97,43 +136,53 @@ class CulturalNameAnalyzer:
                 match = re.match(pattern, name, re.IGNORECASE)
                 if match:
                     for var_template in pattern_data["variations"]:
-                        variation = var_template.format(*match.groups())
-                        variations.append(NameVariation(
-                            original=name,
-                            variation=variation,
-                            culture=culture,
-                            confidence=0.9,
-                            source="cultural"
-                        ))
+                        variations.append(var_template.format(*match.groups()))
+                        confidences.append(0.9)
         
         # Historical name evolution
         if name_lower in self.historical_mappings:
             for historical_var in self.historical_mappings[name_lower]:
-                variations.append(NameVariation(
-                    original=name,
-                    variation=historical_var.title(),
-                    culture="historical",
-                    confidence=0.8,
-                    source="historical"
-                ))
+                variations.append(historical_var.title())
+                confidences.append(0.8)
         
         # Phonetic variations using Soundex-like algorithm
         phonetic_vars = self._generate_phonetic_variations(name)
-        for phonetic_var in phonetic_vars:
-            variations.append(NameVariation(
-                original=name,
-                variation=phonetic_var,
-                culture="phonetic",
-                confidence=0.6,
-                source="phonetic"
-            ))
-        
-        return variations
+        variations.extend(phonetic_vars)
+        confidences.extend([0.6] * len(phonetic_vars))
+        
+        return np.array(variations, dtype=np.str_), np.array(confidences, dtype=np.float64)
+    
+    def variation_key(self, name: str, culture: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """Key under which a name's variations are stored."""
+        culture_key = culture.lower() if culture else None
+        if culture_key not in self.cultural_patterns:
+            culture_key = None  # Only known cultures change the variations
+        return name.lower(), culture_key
+    
+    def build_variation_lookup(self, name: str, culture: Optional[str] = None) -> Dict[str, float]:
+        """Map lowercased variations of a name to their confidence."""
+        _, culture_key = self.variation_key(name, culture)
+        lookup: Dict[str, float] = {}
+        variations, confidences = self.find_name_variations(name, culture_key)
+        # Variations come ordered by confidence, keep the first (best) one
+        for variation, confidence in zip(np.char.lower(variations).tolist(), confidences.tolist()):
+            lookup.setdefault(variation, confidence)
+        return lookup
+    
+    def get_variation_lookup(self, name: str, culture: Optional[str] = None) -> Dict[str, float]:
+        """Memoized build_variation_lookup for ad-hoc (query) names."""
+        key = self.variation_key(name, culture)
+        lookup = self._variation_cache.get(key)
+        if lookup is None:
+            lookup = self.build_variation_lookup(name, culture)
+            if len(self._variation_cache) >= self.max_cached_names:
+                self._variation_cache.clear()
+            self._variation_cache[key] = lookup
+        
+        return lookup
     
     def _generate_phonetic_variations(self, name: str) -> List[str]:
         """Generate phonetic variations of a name."""
-        variations = []
-        
         # Common phonetic substitutions
         substitutions = [
             ('ph', 'f'), ('gh', 'f'), ('ck', 'k'), ('c', 'k'),
@@ -141,19 +190,22 @@ class CulturalNameAnalyzer:
             ('th', 't'), ('v', 'w'), ('w', 'v')
         ]
         
+        # Original first; dedupe as we go and stop once 5 variations exist
         current_variations = [name.lower()]
+        seen = set(current_variations)
         
         for old, new in substitutions:
-            new_variations = []
-            for var in current_variations:
+            for i in range(len(current_variations)):
+                var = current_variations[i]
                 if old in var:
-                    new_variations.append(var.replace(old, new))
-            current_variations.extend(new_variations)
-        
-        # Capitalize and deduplicate
-        variations = list(set([var.title() for var in current_variations if var != name.lower()]))
-        
-        return variations[:5]  # Limit to top 5 variations
+                    variation = var.replace(old, new)
+                    if variation not in seen:
+                        seen.add(variation)
+                        current_variations.append(variation)
+                        if len(current_variations) > 5:
+                            return [var.title() for var in current_variations[1:]]
+        
+        return [var.title() for var in current_variations[1:]]
 
 class GeographicMatcher:
     """
@@ -170,6 +222,16 @@ class GeographicMatcher:
         self.place_hierarchies = self._load_place_hierarchies()
         self.historical_places = self._load_historical_places()
         self.cultural_regions = self._load_cultural_regions()
+        
+        # Precompiled normalization helpers for _normalize_location
+        self._suffix_re = re.compile(r'\b(city|town|village|county|state|province)\b')
+        self._strip_tbl = str.maketrans({c: ' ' for c in string.punctuation})
+    
+    def reload(self):
+        """Reload geographic data, keeping the compiled normalization helpers."""
+        self.place_hierarchies = self._load_place_hierarchies()
+        self.historical_places = self._load_historical_places()
+        self.cultural_regions = self._load_cultural_regions()
     
     def _load_place_hierarchies(self) -> Dict[str, Dict]:
         """Load geographic hierarchies."""
@@ -247,10 +309,10 @@ class GeographicMatcher:
     
     def _normalize_location(self, location: str) -> str:
         """Normalize location string."""
-        # Remove common suffixes and prefixes
-        location = re.sub(r'\b(city|town|village|county|state|province)\b', '', location, flags=re.IGNORECASE)
-        # Clean whitespace and convert to lowercase
-        return ' '.join(location.strip().lower().split())
+        # Lowercase, remove common suffixes/prefixes and punctuation in C
+        location = self._suffix_re.sub('', location.lower()).translate(self._strip_tbl)
+        # Collapse whitespace
+        return ' '.join(location.split())
     
     def _calculate_hierarchy_similarity(self, loc1: str, loc2: str) -> float:
         """Calculate similarity based on geographic hierarchy."""
@@ -294,6 +356,28 @@ class NLPNameLocationMatcher:
         self.cultural_analyzer = CulturalNameAnalyzer()
         self.geo_matcher = GeographicMatcher()
         
+        # Candidate embedding matrix (N, D), L2-normalized, row i <-> _cand_ids[i]
+        self._cand_matrix: Optional[np.ndarray] = None
+        self._cand_ids: Tuple[str, ...] = ()
+        # (user_id, version) per candidate; the cached state is rebuilt when any of them changes
+        self._cand_key: Tuple[Tuple[str, Any], ...] = ()
+        self.max_semantic_candidates = 50
+        
+        # HNSW index over the same embeddings, used once the scored set (full corpus or block)
+        # gets too large for exact search. Built on the first such query, not on refresh.
+        self._index = None
+        self.ann_min_candidates = 10000
+        self.ann_ef_search = 128  # HNSW search breadth; must exceed max_semantic_candidates
+        
+        # (name, culture) -> {variation: confidence} for every candidate name, owned by the
+        # candidate index so the analyzer's bounded cache only holds query names
+        self._cand_variations: Dict[Tuple[str, Optional[str]], Dict[str, float]] = {}
+        
+        # Blocking: (first initial, last name Soundex) -> candidate rows
+        self._cand_rows: Dict[str, int] = {}
+        self._blocks: Dict[Tuple[str, str], List[int]] = {}
+        self.blocking_min_candidates = 1000
+        
         self.is_initialized = False
         
         logger.info("NLP Name & Location Matcher initialized")
@@ -304,7 +388,7 @@ class NLPNameLocationMatcher:
             logger.info("Loading NLP models...")
             
             # Load BERT model for semantic similarity
-            self.bert_model = SentenceTransformer(self.model_name)
+            self.bert_model = get_shared_bert_model(self.model_name)
             
             # Load spaCy model for NER and linguistic analysis
             try:
@@ -343,40 +427,28 @@ class NLPNameLocationMatcher:
             matches = []
             user_id = user_profile.get("user_id")
             
-            # Extract names and locations
-            first_name = user_profile.get("first_name", "")
-            last_name = user_profile.get("last_name", "")
-            location = user_profile.get("location", "")
-            cultural_background = user_profile.get("cultural_background", "")
-            
-            # Generate name variations
-            first_name_vars = self.cultural_analyzer.find_name_variations(
-                first_name, cultural_background
-            )
-            last_name_vars = self.cultural_analyzer.find_name_variations(
-                last_name, cultural_background
-            )
-            
             # Find matches using NLP similarity
             # In production, this would query a database of users
             candidate_users = await self._get_candidate_users(user_profile)
             
-            for candidate in candidate_users:
-                similarity_score = await self._calculate_nlp_similarity(
-                    user_profile, candidate
+            # Score all candidates semantically in one pass, keep only the top ones
+            for candidate, semantic_sim in self._rank_semantic_candidates(
+                user_profile, candidate_users
+            ):
+                scores = await self._calculate_nlp_similarity(
+                    user_profile, candidate, semantic_sim=semantic_sim
                 )
                 
-                if similarity_score > 0.3:  # Minimum threshold
+                if scores.overall > 0.3:  # Minimum threshold
                     matches.append({
                         "user_id": candidate["user_id"],
-                        "confidence_score": similarity_score,
-                        "match_type": self._determine_match_type(similarity_score),
-                        "match_reasons": await self._generate_match_reasons(user_profile, candidate),
-                        "name_similarity": await self._calculate_name_similarity(user_profile, candidate),
-                        "location_similarity": self._calculate_location_similarity(
-                            user_profile.get("location", ""),
-                            candidate.get("location", "")
+                        "confidence_score": scores.overall,
+                        "match_type": self._determine_match_type(scores.overall),
+                        "match_reasons": await self._generate_match_reasons(
+                            user_profile, candidate, scores
                         ),
+                        "name_similarity": scores.name,
+                        "location_similarity": scores.location,
                         "model_source": "nlp_bert_fuzzy"
                     })
             
@@ -395,7 +467,7 @@ class NLPNameLocationMatcher:
         # In production, this would query the database intelligently
         # using name prefixes, location proximity, etc.
         
-        return [
+        corpus = [
             {
                 "user_id": "candidate_1",
                 "first_name": "John",
@@ -418,12 +490,189 @@ class NLPNameLocationMatcher:
                 "cultural_background": "German"
             }
         ]
+        
+        self._refresh_candidate_index(corpus)
+        return self._block_candidates(user_profile, corpus)
+    
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into L2-normalized float32 embeddings."""
+        with torch.inference_mode():
+            embeddings = self.bert_model.encode(
+                texts, convert_to_numpy=True, normalize_embeddings=True
+            )
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    def _refresh_candidate_index(self, candidates: List[Dict[str, Any]]):
+        """Rebuild per-candidate embeddings and name variations when the set or any profile changes."""
+        cand_key = tuple((str(c["user_id"]), self._candidate_version(c)) for c in candidates)
+        if cand_key == self._cand_key:
+            return
+        
+        cand_ids = tuple(user_id for user_id, _ in cand_key)
+        self._cand_key = cand_key
+        self._cand_ids = cand_ids
+        self._cand_rows = {cand_id: row for row, cand_id in enumerate(cand_ids)}
+        self._index = None
+        
+        # Precompute candidate name variations once instead of per comparison, for every known
+        # culture in the corpus (queries look names up under the querying user's culture)
+        cultures = {None} | (
+            {str(c.get("cultural_background")).lower() for c in candidates if c.get("cultural_background")}
+            & self.cultural_analyzer.cultural_patterns.keys()
+        )
+        analyzer = self.cultural_analyzer
+        cand_variations: Dict[Tuple[str, Optional[str]], Dict[str, float]] = {}
+        for candidate in candidates:
+            for field in ("first_name", "last_name"):
+                name = candidate.get(field, "")
+                if name:
+                    for culture in cultures:
+                        key = analyzer.variation_key(name, culture)
+                        if key not in cand_variations:
+                            cand_variations[key] = analyzer.build_variation_lookup(name, culture)
+        self._cand_variations = cand_variations
+        
+        self._blocks = {}
+        for row, candidate in enumerate(candidates):
+            key = self._block_key(candidate)
+            if key:
+                self._blocks.setdefault(key, []).append(row)
+        
+        if not self.bert_model or not candidates:
+            self._cand_matrix = None
+            return
+        
+        texts = [self._create_profile_text(c) for c in candidates]
+        matrix = self._embed([t or " " for t in texts])
+        # Profiles without any text never contribute semantic similarity
+        for i, text in enumerate(texts):
+            if not text:
+                matrix[i] = 0.0
+        self._cand_matrix = matrix
+    
+    def _variation_lookup(self, name: str, culture: Optional[str] = None) -> Dict[str, float]:
+        """Variations of a name, from the candidate index when it is a candidate name."""
+        lookup = self._cand_variations.get(self.cultural_analyzer.variation_key(name, culture))
+        if lookup is None:
+            lookup = self.cultural_analyzer.get_variation_lookup(name, culture)
+        return lookup
+    
+    def _candidate_index(self):
+        """HNSW index over the candidate matrix, built on first use."""
+        if self._index is None:
+            index = faiss.IndexHNSWFlat(self._cand_matrix.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+            index.add(self._cand_matrix)
+            self._index = index
+        return self._index
+    
+    @staticmethod
+    def _candidate_version(candidate: Dict[str, Any]) -> Any:
+        """Profile version: updated_at when stored, else the fields the cached state is built from."""
+        updated_at = candidate.get("updated_at")
+        if updated_at is not None:
+            return updated_at
+        return tuple(
+            candidate.get(field)
+            for field in ("first_name", "last_name", "location", "cultural_background", "profession")
+        )
+    
+    def _block_key(self, profile: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """Blocking key: first initial and Soundex code of the last name."""
+        first = (profile.get("first_name") or "").strip().lower()
+        last = (profile.get("last_name") or "").strip()
+        if not first or not last:
+            return None
+        return first[0], jellyfish.soundex(last)
+    
+    def _block_candidates(
+        self,
+        user_profile: Dict[str, Any],
+        candidates: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Keep candidates whose blocking key is the user's or one edit away from it."""
+        if len(candidates) < self.blocking_min_candidates:
+            return candidates
+        
+        key = self._block_key(user_profile)
+        if not key:
+            return candidates  # Nothing to block on
+        
+        initial, code = key
+        # Known first-name variations (William -> Bill) may change the initial
+        first_name = user_profile["first_name"].strip()
+        initials = {initial} | {
+            variation[0] for variation in self.cultural_analyzer.get_variation_lookup(first_name)
+            if variation
+        }
+        codes = {code} | {
+            code[:i] + digit + code[i + 1:]
+            for i in range(1, len(code)) for digit in "0123456"
+        }
+        
+        rows = sorted({
+            row
+            for first in initials for soundex in codes
+            for row in self._blocks.get((first, soundex), ())
+        })
+        return [candidates[row] for row in rows]
+    
+    def _rank_semantic_candidates(
+        self,
+        user_profile: Dict[str, Any],
+        candidates: List[Dict[str, Any]]
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Return (candidate, semantic similarity) for the top candidates."""
+        n = len(candidates)
+        if n == 0:
+            return []
+        
+        user_text = self._create_profile_text(user_profile)
+        if self._cand_matrix is None or not user_text:
+            return [(c, 0.0) for c in candidates]
+        
+        k = min(self.max_semantic_candidates, n)
+        is_full_corpus = n == len(self._cand_ids)
+        
+        try:
+            user_vec = self._embed([user_text])[0]
+            
+            rows = None if is_full_corpus else [self._cand_rows[str(c["user_id"])] for c in candidates]
+            
+            if faiss is not None and n >= self.ann_min_candidates:
+                ef_search = max(self.ann_ef_search, k)
+                if rows is None:
+                    params = faiss.SearchParametersHNSW(efSearch=ef_search)
+                    by_row = candidates
+                else:
+                    # Large block: restrict the corpus index search to the block's rows
+                    selector = faiss.IDSelectorBatch(np.asarray(rows, dtype=np.int64))
+                    params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+                    by_row = dict(zip(rows, candidates))
+                scores, ids = self._candidate_index().search(user_vec.reshape(1, -1), k, params=params)
+                return [
+                    (by_row[int(i)], float(score))
+                    for i, score in zip(ids[0], scores[0]) if i >= 0
+                ]
+            
+            matrix = self._cand_matrix if rows is None else self._cand_matrix[rows]
+            sims = matrix @ user_vec
+        except Exception as e:
+            logger.error(f"BERT similarity calculation error: {str(e)}")
+            return [(c, 0.0) for c in candidates]
+        
+        if k < n:
+            top = np.argpartition(-sims, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        
+        return [(candidates[i], float(sims[i])) for i in top]
     
     async def _calculate_nlp_similarity(
         self,
         profile1: Dict[str, Any],
-        profile2: Dict[str, Any]
-    ) -> float:
+        profile2: Dict[str, Any],
+        semantic_sim: Optional[float] = None
+    ) -> ScoreBreakdown:
         """Calculate overall NLP-based similarity between profiles."""
         
         # Name similarity
@@ -441,8 +690,9 @@ class NLPNameLocationMatcher:
             profile2.get("cultural_background", "")
         )
         
-        # Semantic similarity using BERT
-        semantic_sim = await self._calculate_semantic_similarity(profile1, profile2)
+        # Semantic similarity using BERT (precomputed when ranking candidates)
+        if semantic_sim is None:
+            semantic_sim = await self._calculate_semantic_similarity(profile1, profile2)
         
         # Weighted combination
         overall_similarity = (
@@ -452,7 +702,13 @@ class NLPNameLocationMatcher:
             semantic_sim * 0.15
         )
         
-        return min(overall_similarity, 1.0)
+        return ScoreBreakdown(
+            overall=min(overall_similarity, 1.0),
+            name=name_sim,
+            location=location_sim,
+            cultural=cultural_sim,
+            semantic=semantic_sim
+        )
     
     async def _calculate_name_similarity(
         self,
@@ -503,24 +759,14 @@ class NLPNameLocationMatcher:
         # Cultural variation matching
         cultural_score = 0.0
         if cultural_context:
-            variations1 = self.cultural_analyzer.find_name_variations(name1, cultural_context)
-            variations2 = self.cultural_analyzer.find_name_variations(name2, cultural_context)
+            variations1 = self._variation_lookup(name1, cultural_context)
+            variations2 = self._variation_lookup(name2, cultural_context)
             
             # Check if names are cultural variations of each other
-            for var1 in variations1:
-                if var1.variation.lower() == name2:
-                    cultural_score = var1.confidence
-                    break
-            
-            for var2 in variations2:
-                if var2.variation.lower() == name1:
-                    cultural_score = max(cultural_score, var2.confidence)
-                    break
+            cultural_score = max(variations1.get(name2, 0.0), variations2.get(name1, 0.0))
         
-        # Edit distance penalty
-        edit_dist = edit_distance(name1, name2)
-        max_len = max(len(name1), len(name2))
-        edit_score = 1 - (edit_dist / max_len) if max_len > 0 else 0
+        # Edit distance penalty: 1 - distance / max_len
+        edit_score = Levenshtein.normalized_similarity(name1, name2)
         
         # Weighted combination
         final_score = max(
@@ -575,7 +821,8 @@ class NLPNameLocationMatcher:
                 return 0.0
             
             # Generate embeddings
-            embeddings = self.bert_model.encode([text1, text2])
+            with torch.inference_mode():
+                embeddings = self.bert_model.encode([text1, text2]).astype(np.float32)
             
             # Calculate cosine similarity
             similarity = np.dot(embeddings[0], embeddings[1]) / (
@@ -615,44 +862,32 @@ class NLPNameLocationMatcher:
         
         return ". ".join(text_parts)
     
-    def _calculate_location_similarity(self, loc1: str, loc2: str) -> float:
-        """Calculate location similarity using geographic matcher."""
-        return self.geo_matcher.calculate_location_similarity(loc1, loc2)
-    
     async def _generate_match_reasons(
         self,
         profile1: Dict[str, Any],
-        profile2: Dict[str, Any]
+        profile2: Dict[str, Any],
+        scores: ScoreBreakdown
     ) -> List[str]:
         """Generate human-readable reasons for the match."""
         reasons = []
         
         # Name similarity reasons
-        name_sim = await self._calculate_name_similarity(profile1, profile2)
-        if name_sim > 0.8:
+        if scores.name > 0.8:
             reasons.append("Very similar names")
-        elif name_sim > 0.6:
+        elif scores.name > 0.6:
             reasons.append("Similar names with possible variations")
         
         # Location reasons
-        loc_sim = self._calculate_location_similarity(
-            profile1.get("location", ""), 
-            profile2.get("location", "")
-        )
-        if loc_sim > 0.9:
+        if scores.location > 0.9:
             reasons.append("Same location")
-        elif loc_sim > 0.6:
+        elif scores.location > 0.6:
             reasons.append("Similar geographic region")
         
         # Cultural reasons
-        culture1 = profile1.get("cultural_background", "")
-        culture2 = profile2.get("cultural_background", "")
-        if culture1 and culture2:
-            cultural_sim = self._calculate_cultural_similarity(culture1, culture2)
-            if cultural_sim > 0.9:
-                reasons.append("Same cultural background")
-            elif cultural_sim > 0.6:
-                reasons.append("Related cultural heritage")
+        if scores.cultural > 0.9:
+            reasons.append("Same cultural background")
+        elif scores.cultural > 0.6:
+            reasons.append("Related cultural heritage")
         
         return reasons if reasons else ["General profile similarity"]
     
@@ -674,25 +909,8 @@ class NLPNameLocationMatcher:
         return await self._calculate_name_similarity(profile1, profile2)
     
     async def health_check(self) -> bool:
-        """Check if NLP engine is healthy."""
-        try:
-            if not self.is_initialized:
-                return False
-            
-            # Test BERT model
-            if self.bert_model:
-                test_embeddings = self.bert_model.encode(["test"])
-                if test_embeddings is None or len(test_embeddings) == 0:
-                    return False
-            
-            # Test cultural analyzer
-            test_variations = self.cultural_analyzer.find_name_variations("John", "Irish")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"NLP health check failed: {str(e)}")
-            return False
+        """Check if NLP engine is healthy (without running the model)."""
+        return self.is_initialized and self.bert_model is not None
     
     async def get_status(self) -> Dict[str, Any]:
         """Get status information about NLP engine."""
@@ -711,6 +929,7 @@ class NLPNameLocationMatcher:
         logger.info("Updating NLP models...")
         # In production, this would retrain or update models
         # For now, just reload cultural patterns
-        self.cultural_analyzer = CulturalNameAnalyzer()
-        self.geo_matcher = GeographicMatcher()
+        self.cultural_analyzer.reload_patterns()
+        self.geo_matcher.reload()
+        self._cand_key = ()  # Rebuild candidate variations from the new patterns on next refresh
         logger.info("✅ NLP models updated")
\ No newline at end of file
@@ -7,15 +7,46 @@ Uses multiple algorithms to calculate similarity and relationship predictions.
 """
 
 import logging
+from functools import lru_cache
 from typing import Dict, List, Any, Optional, Tuple
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 import re
 import unicodedata
-from difflib import SequenceMatcher
 import math
+import numpy as np
+import jellyfish
+from rapidfuzz import fuzz
 
 logger = logging.getLogger(__name__)
 
+# ASCII characters that r'[^\w\s]' would strip
+_ASCII_PUNCT_TABLE = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if not (c.isalnum() or c == '_' or c.isspace())
+))
+
+@lru_cache(maxsize=100_000)
+def _normalize_name(name: str) -> str:
+    """Normalize a name string (cached, names repeat across users and queries)"""
+    # Fast path: ASCII names have no diacritics, so one translate does the cleanup
+    if name.isascii():
+        return ' '.join(name.lower().translate(_ASCII_PUNCT_TABLE).split())
+    
+    # Remove diacritics and normalize unicode
+    name = unicodedata.normalize('NFD', name.lower())
+    name = ''.join(c for c in name if unicodedata.category(c) != 'Mn')
+    
+    # Remove special characters and extra spaces
+    name = re.sub(r'[^\w\s]', '', name)
+    return ' '.join(name.split())
+
+@lru_cache(maxsize=100_000)
+def _normalize_location(location: str) -> str:
+    """Normalize a location string (cached)"""
+    location = location.lower().strip()
+    # Remove common words
+    location = re.sub(r'\b(city|town|village|area|district)\b', '', location)
+    return ' '.join(location.split())
+
 class RealMatchingEngine:
     """Production AI matching engine using real user data"""
     
@@ -38,174 +69,363 @@ class RealMatchingEngine:
             'common_cultural_names': 0.4,
             'location_family_clusters': 0.5
         }
+        
+        # Arabic name patterns, one compiled pass instead of a substring scan per pattern
+        self._arabic_re = re.compile(r'\b(?:ahmed|mohammad|hassan|omar|ali|fatima|aisha|zahra)\b')
+        
+        # Normalized strings interned to ints so exact-match branches compare ids (0 = empty).
+        # Ids are only compared within one call, so the map is reset between calls once full.
+        self._string_ids: Dict[str, int] = {'': 0}
+        self.max_interned_strings = 100000
+        
+        # Location words, so "Boston, MA" and "boston" share the token "boston"
+        self._word_re = re.compile(r'\w+')
+        
+        # Blocking on last name, or on location word and age decade, for large candidate pools
+        self.blocking_min_candidates = 1000
+        
+        # Symmetric scores per versioned user pair, see _pair_key: name, location, demographic,
+        # interests, then the first name and profession fuzzy scores that reasons are built from
+        self._pair_cache: Dict[Tuple, Tuple[float, float, float, float, float, float]] = {}
+        self.max_cached_pairs = 100000
+    
+    def _reset_interned_if_full(self):
+        """Clear the intern map at a call boundary once it reaches max_interned_strings"""
+        if len(self._string_ids) >= self.max_interned_strings:
+            self._string_ids = {'': 0}
+    
+    def _intern(self, value: str) -> int:
+        """Stable integer id for a normalized string"""
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._string_ids)
+        return string_id
     
-    def calculate_name_similarity(self, user1: Dict, user2: Dict) -> Tuple[float, List[str]]:
+    def _prepare(self, user: Dict) -> Dict:
+        """Normalize and parse matching fields once per user (input to the calculate_* helpers)"""
+        first_n = self.normalize_name(user.get('first_name', ''))
+        last_n = self.normalize_name(user.get('last_name', ''))
+        location = user.get('location', '')
+        loc_n = self.normalize_location(location)
+        profession = user.get('profession') or ''
+        prof_n = str(profession).lower() if profession else ''
+        gender = str(user.get('gender') or '').lower()
+        # Profile version for the pair cache (explicit counter, else the Mongo updated_at timestamp)
+        version = user.get('version', user.get('updated_at'))
+        
+        return {
+            '_id': user['_id'],
+            'cache_key': (str(user['_id']), version) if version is not None else None,
+            'first_n': first_n,
+            'last_n': last_n,
+            'last_id': self._intern(last_n),
+            'last_dm': jellyfish.metaphone(last_n) if last_n else '',
+            'location': location,
+            'loc_n': loc_n,
+            'loc_id': self._intern(loc_n),
+            'loc_tokens': frozenset(self._word_re.findall(loc_n)),
+            'loc_lower': (location or '').lower(),
+            'prof_n': prof_n,
+            'prof_id': self._intern(prof_n),
+            'gender_id': self._intern(gender),
+            'interests_set': self.extract_interests(user),
+            'age': self.extract_age(user),
+            'created_ts': self.parse_created_at(user),
+            'is_arabic_name': self.is_arabic_name(user)
+        }
+    
+    def _assign_interest_masks(self, preps: List[Dict]):
+        """Encode each prepared user's interests as a bitmask over a shared vocabulary"""
+        vocab: Dict[str, int] = {}
+        for prep in preps:
+            for interest in prep['interests_set']:
+                vocab.setdefault(interest, len(vocab))
+        
+        terms = list(vocab)
+        for prep in preps:
+            mask = 0
+            for interest in prep['interests_set']:
+                mask |= 1 << vocab[interest]
+            prep['interest_mask'] = mask
+            prep['interest_vocab'] = terms
+    
+    def calculate_name_similarity(self, user1: Dict, user2: Dict, first_similarity: Optional[float] = None) -> Tuple[float, List[str]]:
         """Calculate name-based similarity and matching reasons"""
         reasons = []
+        return self._name_score(user1, user2, first_similarity, reasons), reasons
+    
+    def _name_score(
+        self,
+        user1: Dict,
+        user2: Dict,
+        first_similarity: Optional[float] = None,
+        reasons: Optional[List[str]] = None
+    ) -> float:
+        """Name similarity of two prepared users, appending reasons when a list is given"""
         score = 0.0
         
-        # Extract names
-        name1_first = self.normalize_name(user1.get('first_name', ''))
-        name1_last = self.normalize_name(user1.get('last_name', ''))
-        name2_first = self.normalize_name(user2.get('first_name', ''))
-        name2_last = self.normalize_name(user2.get('last_name', ''))
+        # Pre-normalized names
+        name1_first = user1['first_n']
+        name1_last = user1['last_n']
+        name2_first = user2['first_n']
+        name2_last = user2['last_n']
         
         # Exact last name match (strong family indicator)
-        if name1_last and name2_last and name1_last == name2_last:
+        if user1['last_id'] and user1['last_id'] == user2['last_id']:
             score += 0.8
-            reasons.append(f"Same last name: {name1_last}")
-        
-        # Similar last name (fuzzy match)
-        elif name1_last and name2_last:
-            similarity = SequenceMatcher(None, name1_last, name2_last).ratio()
-            if similarity > 0.8:
-                score += 0.6 * similarity
-                reasons.append(f"Similar last name: {name1_last} / {name2_last}")
-        
-        # First name similarity
-        if name1_first and name2_first:
-            first_similarity = SequenceMatcher(None, name1_first, name2_first).ratio()
-            if first_similarity > 0.7:
-                score += 0.3 * first_similarity
+            if reasons is not None:
+                reasons.append(f"Same last name: {name1_last}")
+        
+        # Phonetically similar last name (same metaphone key)
+        elif user1['last_dm'] and user1['last_dm'] == user2['last_dm']:
+            score += 0.6
+            if reasons is not None:
+                reasons.append(f"Phonetically similar last name: {name1_last} / {name2_last}")
+        
+        # First name similarity (may be precomputed by the scoring pass)
+        if first_similarity is None:
+            first_similarity = self.calculate_first_name_similarity(user1, user2)
+        if first_similarity > 0.7:
+            score += 0.3 * first_similarity
+            if reasons is not None:
                 reasons.append(f"Similar first name: {name1_first} / {name2_first}")
         
         # Cultural name patterns (Arabic, Western, etc.)
         cultural_score = self.analyze_cultural_names(user1, user2)
         if cultural_score > 0:
             score += cultural_score * 0.4
-            reasons.append("Similar cultural naming patterns")
+            if reasons is not None:
+                reasons.append("Similar cultural naming patterns")
         
-        return min(score, 1.0), reasons
+        return min(score, 1.0)
+    
+    def calculate_first_name_similarity(self, user1: Dict, user2: Dict) -> float:
+        """Fuzzy first-name similarity (0 below the 70 cutoff or when either name is missing)"""
+        name1_first = user1['first_n']
+        name2_first = user2['first_n']
+        
+        if not name1_first or not name2_first:
+            return 0.0
+        if name1_first == name2_first:
+            return 1.0
+        return fuzz.WRatio(name1_first, name2_first, score_cutoff=70) / 100.0
     
     def calculate_location_proximity(self, user1: Dict, user2: Dict) -> Tuple[float, List[str]]:
         """Calculate location-based similarity"""
         reasons = []
-        score = 0.0
-        
-        loc1 = user1.get('location', '')
-        loc2 = user2.get('location', '')
+        return self._location_score(user1, user2, reasons), reasons
+    
+    def _location_score(self, user1: Dict, user2: Dict, reasons: Optional[List[str]] = None) -> float:
+        """Location proximity of two prepared users, appending reasons when a list is given"""
+        loc1 = user1['location']
+        loc2 = user2['location']
         
         if not loc1 or not loc2:
-            return 0.0, reasons
+            return 0.0
         
-        loc1_norm = self.normalize_location(loc1)
-        loc2_norm = self.normalize_location(loc2)
+        tokens1 = user1['loc_tokens']
+        tokens2 = user2['loc_tokens']
         
         # Exact location match
-        if loc1_norm == loc2_norm:
-            score = 0.9
-            reasons.append(f"Same location: {loc1}")
+        if user1['loc_id'] == user2['loc_id']:
+            if reasons is not None:
+                reasons.append(f"Same location: {loc1}")
+            return 0.9
         
         # City/region similarity
-        elif self.locations_nearby(loc1_norm, loc2_norm):
-            score = 0.6
-            reasons.append(f"Nearby locations: {loc1} / {loc2}")
+        if self.locations_nearby(tokens1, tokens2):
+            if reasons is not None:
+                reasons.append(f"Nearby locations: {loc1} / {loc2}")
+            return 0.6
         
         # Country/state level match
-        elif self.same_region(loc1_norm, loc2_norm):
-            score = 0.3
-            reasons.append(f"Same region: {loc1} / {loc2}")
+        if self.same_region(tokens1, tokens2):
+            if reasons is not None:
+                reasons.append(f"Same region: {loc1} / {loc2}")
+            return 0.3
         
-        return score, reasons
+        return 0.0
     
-    def calculate_demographic_match(self, user1: Dict, user2: Dict) -> Tuple[float, List[str]]:
+    def calculate_demographic_match(
+        self,
+        user1: Dict,
+        user2: Dict,
+        age_score: Optional[float] = None,
+        gender_score: Optional[float] = None,
+        prof_score: Optional[float] = None
+    ) -> Tuple[float, List[str]]:
         """Calculate demographic compatibility"""
         reasons = []
+        return self._demographic_score(user1, user2, age_score, gender_score, prof_score, reasons), reasons
+    
+    def _demographic_score(
+        self,
+        user1: Dict,
+        user2: Dict,
+        age_score: Optional[float] = None,
+        gender_score: Optional[float] = None,
+        prof_score: Optional[float] = None,
+        reasons: Optional[List[str]] = None
+    ) -> float:
+        """Demographic compatibility of two prepared users, appending reasons when a list is given"""
         score = 0.0
         
-        # Age proximity
-        age_score = self.calculate_age_proximity(user1, user2)
+        # Age proximity (may be precomputed by batch_proximity_scores)
+        if age_score is None:
+            age_score = self.calculate_age_proximity(user1, user2)
         if age_score > 0:
             score += age_score * 0.5
-            if age_score > 0.7:
+            if age_score > 0.7 and reasons is not None:
                 reasons.append("Similar age group")
         
-        # Gender complementarity (for friend matching)
-        gender_score = self.calculate_gender_compatibility(user1, user2)
+        # Gender complementarity (for friend matching, may be precomputed by batch_gender_scores)
+        if gender_score is None:
+            gender_score = self.calculate_gender_compatibility(user1, user2)
         score += gender_score * 0.3
         
-        # Professional similarity
-        prof_score = self.calculate_professional_match(user1, user2)
+        # Professional similarity (may be precomputed by the scoring pass)
+        if prof_score is None:
+            prof_score = self.calculate_professional_match(user1, user2)
         if prof_score > 0:
             score += prof_score * 0.2
-            if prof_score > 0.7:
+            if prof_score > 0.7 and reasons is not None:
                 reasons.append("Similar profession")
         
-        return min(score, 1.0), reasons
+        return min(score, 1.0)
     
     def calculate_interests_overlap(self, user1: Dict, user2: Dict) -> Tuple[float, List[str]]:
         """Calculate shared interests and hobbies"""
         reasons = []
+        return self._interests_score(user1, user2, reasons), reasons
+    
+    def _interests_score(self, user1: Dict, user2: Dict, reasons: Optional[List[str]] = None) -> float:
+        """Interest overlap of two prepared users, appending reasons when a list is given"""
+        mask1 = user1['interest_mask']
+        mask2 = user2['interest_mask']
         
-        interests1 = self.extract_interests(user1)
-        interests2 = self.extract_interests(user2)
-        
-        if not interests1 or not interests2:
-            return 0.0, reasons
-        
-        # Calculate Jaccard similarity
-        intersection = interests1.intersection(interests2)
-        union = interests1.union(interests2)
-        
-        if not union:
-            return 0.0, reasons
-        
-        score = len(intersection) / len(union)
+        if not mask1 or not mask2:
+            return 0.0
         
-        if intersection:
-            common_interests = list(intersection)[:3]  # Top 3
+        # Jaccard similarity on interest bitsets (popcount)
+        intersection = mask1 & mask2
+        score = intersection.bit_count() / (mask1 | mask2).bit_count()
+        
+        if intersection and reasons is not None:
+            # Top 3, decoded from the lowest set bits
+            vocab = user1['interest_vocab']
+            common_interests = []
+            while intersection and len(common_interests) < 3:
+                lowest = intersection & -intersection
+                common_interests.append(vocab[lowest.bit_length() - 1])
+                intersection ^= lowest
             reasons.append(f"Common interests: {', '.join(common_interests)}")
         
-        return score, reasons
+        return score
     
-    def calculate_temporal_proximity(self, user1: Dict, user2: Dict) -> Tuple[float, List[str]]:
+    def calculate_temporal_proximity(self, user1: Dict, user2: Dict, score: Optional[float] = None) -> Tuple[float, List[str]]:
         """Calculate temporal relationship (joined around same time, etc.)"""
         reasons = []
         
-        created1 = user1.get('created_at')
-        created2 = user2.get('created_at')
-        
-        if not created1 or not created2:
-            return 0.0, reasons
-        
-        # Convert to datetime if string
-        if isinstance(created1, str):
-            created1 = datetime.fromisoformat(created1.replace('Z', '+00:00'))
-        if isinstance(created2, str):
-            created2 = datetime.fromisoformat(created2.replace('Z', '+00:00'))
-        
-        # Calculate time difference in days
-        time_diff = abs((created1 - created2).days)
+        if score is None:
+            created1 = user1['created_ts']
+            created2 = user2['created_ts']
+            
+            if created1 is None or created2 is None:
+                return 0.0, reasons
+            
+            # Calculate time difference in whole days
+            time_diff = abs(math.floor((created1 - created2) / 86400))
+            
+            # Score based on temporal proximity
+            if time_diff <= 7:  # Same week
+                score = 0.8
+            elif time_diff <= 30:  # Same month
+                score = 0.5
+            elif time_diff <= 90:  # Same quarter
+                score = 0.2
+            else:
+                score = 0.0
         
-        # Score based on temporal proximity
-        if time_diff <= 7:  # Same week
-            score = 0.8
+        if score >= 0.8:
             reasons.append("Joined around the same time")
-        elif time_diff <= 30:  # Same month
-            score = 0.5
-        elif time_diff <= 90:  # Same quarter
-            score = 0.2
-        else:
-            score = 0.0
         
         return score, reasons
     
+    def _candidate_arrays(self, candidates: List[Dict]) -> Dict[str, np.ndarray]:
+        """Structure-of-arrays view of the numeric fields of prepared candidates"""
+        n = len(candidates)
+        ages = np.zeros(n, dtype=np.int16)  # 0 = unknown
+        created = np.full(n, np.nan, dtype=np.float64)  # NaN = unknown
+        genders = np.zeros(n, dtype=np.int32)  # Interned ids, 0 = unknown
+        for i, c in enumerate(candidates):
+            genders[i] = c['gender_id']
+            if c['age']:
+                ages[i] = c['age']
+            if c['created_ts'] is not None:
+                created[i] = c['created_ts']
+        return {'age': ages, 'created_ts': created, 'gender_id': genders}
+    
+    def batch_proximity_scores(self, target: Dict, cand_arrays: Dict[str, np.ndarray]) -> Tuple[List[float], List[float]]:
+        """Age and temporal proximity of one prepared user against many, vectorized"""
+        ages = cand_arrays['age']
+        created = cand_arrays['created_ts']
+        n = len(ages)
+        
+        target_age = target['age']
+        if target_age:
+            age_diff = np.abs(ages.astype(np.int32) - target_age)
+            age_scores = np.select(
+                [age_diff <= 2, age_diff <= 5, age_diff <= 10, age_diff <= 20],
+                [1.0, 0.8, 0.6, 0.3],
+                default=0.1
+            )
+            age_scores[ages == 0] = 0.0  # Unknown age
+        else:
+            age_scores = np.zeros(n)
+        
+        target_created = target['created_ts']
+        if target_created is not None:
+            days = np.abs(np.floor((target_created - created) / 86400))
+            # NaN (unknown) fails every comparison and falls to the default
+            temporal_scores = np.select(
+                [days <= 7, days <= 30, days <= 90],
+                [0.8, 0.5, 0.2],
+                default=0.0
+            )
+        else:
+            temporal_scores = np.zeros(n)
+        
+        return age_scores.tolist(), temporal_scores.tolist()
+    
+    def batch_gender_scores(self, target: Dict, cand_arrays: Dict[str, np.ndarray]) -> List[float]:
+        """Gender compatibility of one prepared user against many, vectorized"""
+        genders = cand_arrays['gender_id']
+        target_gender = target['gender_id']
+        if not target_gender:
+            return [0.5] * len(genders)
+        return np.where(genders == target_gender, 0.7, 0.5).tolist()
+    
     def predict_relationship_type(self, user1: Dict, user2: Dict, overall_score: float, name_score: float, match_context: str = "general") -> Tuple[str, str, float]:
         """Predict the type of relationship and confidence based on match context"""
         
-        # Extract ages for relationship logic
-        age1 = self.extract_age(user1)
-        age2 = self.extract_age(user2)
-        age_diff = abs(age1 - age2) if age1 and age2 else 0
+        # Ages for relationship logic
+        age1 = user1['age']
+        age2 = user2['age']
+        if age1 and age2:
+            age_diff = abs(age1 - age2)
+            age_sign = (age1 > age2) - (age1 < age2)  # 1 if user1 is older
+        else:
+            age_diff = 0
+            age_sign = 0
         
-        # Extract locations and professions for context
-        loc1 = user1.get('location', '').lower()
-        loc2 = user2.get('location', '').lower()
-        prof1 = (user1.get('profession') or '').lower()
-        prof2 = (user2.get('profession') or '').lower()
+        # Locations and professions for context
+        loc1 = user1['loc_lower']
+        loc2 = user2['loc_lower']
+        prof1 = user1['prof_n']
+        prof2 = user2['prof_n']
         
         same_location = loc1 and loc2 and (loc1 in loc2 or loc2 in loc1)
-        same_profession = prof1 and prof2 and prof1 == prof2
+        same_profession = prof1 and prof2 and user1['prof_id'] == user2['prof_id']
         
         # FAMILY CONTEXT - Only family relationship predictions
         if match_context == "family":
@@ -217,12 +437,12 @@ class RealMatchingEngine:
                 elif age_diff <= 15:
                     return "family", "possible cousin", 0.8
                 elif age_diff <= 25:
-                    if age1 and age2 and age1 > age2:
+                    if age_sign > 0:
                         return "family", "possible uncle/aunt", 0.8
                     else:
                         return "family", "possible nephew/niece", 0.8
                 elif age_diff <= 40:
-                    if age1 and age2 and age1 > age2:
+                    if age_sign > 0:
                         return "family", "possible parent", 0.85
                     else:
                         return "family", "possible child", 0.85
@@ -308,17 +528,7 @@ class RealMatchingEngine:
             return ""
         
         # Convert to string if not already
-        name = str(name)
-        
-        # Remove diacritics and normalize unicode
-        name = unicodedata.normalize('NFD', name.lower())
-        name = ''.join(c for c in name if unicodedata.category(c) != 'Mn')
-        
-        # Remove special characters and extra spaces
-        name = re.sub(r'[^\w\s]', '', name)
-        name = ' '.join(name.split())
-        
-        return name
+        return _normalize_name(str(name))
     
     def normalize_location(self, location: str) -> str:
         """Normalize location for comparison"""
@@ -326,45 +536,37 @@ class RealMatchingEngine:
             return ""
         
         # Convert to string if not already
-        location = str(location).lower().strip()
-        # Remove common words
-        location = re.sub(r'\b(city|town|village|area|district)\b', '', location)
-        location = ' '.join(location.split())
-        
-        return location
+        return _normalize_location(str(location))
+    
+    def is_arabic_name(self, user: Dict) -> bool:
+        """Check whether a user's name follows Arabic naming patterns"""
+        name = f"{user.get('first_name', '')} {user.get('last_name', '')}".lower()
+        return self._arabic_re.search(name) is not None
     
     def analyze_cultural_names(self, user1: Dict, user2: Dict) -> float:
         """Analyze cultural naming patterns"""
         # Simple heuristic - could be enhanced with ML models
-        name1 = f"{user1.get('first_name', '')} {user1.get('last_name', '')}".lower()
-        name2 = f"{user2.get('first_name', '')} {user2.get('last_name', '')}".lower()
-        
-        # Arabic names pattern
-        arabic_patterns = ['ahmed', 'mohammad', 'hassan', 'omar', 'ali', 'fatima', 'aisha', 'zahra']
-        arabic1 = any(pattern in name1 for pattern in arabic_patterns)
-        arabic2 = any(pattern in name2 for pattern in arabic_patterns)
-        
-        if arabic1 and arabic2:
+        if user1['is_arabic_name'] and user2['is_arabic_name']:
             return 0.6
         
         return 0.0
     
-    def locations_nearby(self, loc1: str, loc2: str) -> bool:
-        """Check if locations are nearby (simple heuristic)"""
+    def locations_nearby(self, tokens1: frozenset, tokens2: frozenset) -> bool:
+        """Check if locations are nearby (word-set Jaccard of at least 0.5)"""
         # This could be enhanced with actual geographic distance calculation
-        return SequenceMatcher(None, loc1, loc2).ratio() > 0.6
+        if not tokens1 or not tokens2:
+            return False
+        return 2 * len(tokens1 & tokens2) >= len(tokens1 | tokens2)
     
-    def same_region(self, loc1: str, loc2: str) -> bool:
+    def same_region(self, tokens1: frozenset, tokens2: frozenset) -> bool:
         """Check if locations are in the same region"""
         # Simple word overlap
-        words1 = set(loc1.split())
-        words2 = set(loc2.split())
-        return len(words1.intersection(words2)) > 0
+        return not tokens1.isdisjoint(tokens2)
     
     def calculate_age_proximity(self, user1: Dict, user2: Dict) -> float:
         """Calculate age-based compatibility"""
-        age1 = self.extract_age(user1)
-        age2 = self.extract_age(user2)
+        age1 = user1['age']
+        age2 = user2['age']
         
         if not age1 or not age2:
             return 0.0
@@ -404,15 +606,23 @@ class RealMatchingEngine:
         except:
             return None
     
+    def parse_created_at(self, user: Dict) -> Optional[float]:
+        """Parse created_at into a POSIX timestamp (naive datetimes are UTC)"""
+        created = user.get('created_at')
+        if not created:
+            return None
+        
+        # Convert to datetime if string
+        if isinstance(created, str):
+            created = datetime.fromisoformat(created.replace('Z', '+00:00'))
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        return created.timestamp()
+    
     def calculate_gender_compatibility(self, user1: Dict, user2: Dict) -> float:
         """Calculate gender-based compatibility"""
-        gender1 = user1.get('gender') or ''
-        gender2 = user2.get('gender') or ''
-        
-        if gender1:
-            gender1 = str(gender1).lower()
-        if gender2:
-            gender2 = str(gender2).lower()
+        gender1 = user1['gender_id']
+        gender2 = user2['gender_id']
         
         if not gender1 or not gender2:
             return 0.5  # Neutral if unknown
@@ -422,18 +632,17 @@ class RealMatchingEngine:
     
     def calculate_professional_match(self, user1: Dict, user2: Dict) -> float:
         """Calculate professional similarity"""
-        prof1 = user1.get('profession') or ''
-        prof2 = user2.get('profession') or ''
-        
-        if prof1:
-            prof1 = str(prof1).lower()
-        if prof2:
-            prof2 = str(prof2).lower()
+        prof1 = user1['prof_n']
+        prof2 = user2['prof_n']
         
         if not prof1 or not prof2:
             return 0.0
         
-        return SequenceMatcher(None, prof1, prof2).ratio()
+        if user1['prof_id'] == user2['prof_id']:
+            return 1.0
+        
+        # Token based so "Software Engineer" matches "Engineer, Software"
+        return fuzz.token_set_ratio(prof1, prof2) / 100.0
     
     def extract_interests(self, user: Dict) -> set:
         """Extract interests from user data"""
@@ -448,6 +657,46 @@ class RealMatchingEngine:
         
         return set(interests)
     
+    def _pair_key(self, user1: Dict, user2: Dict) -> Optional[Tuple]:
+        """Order-independent cache key for two prepared users, None if either is unversioned"""
+        key1 = user1['cache_key']
+        key2 = user2['cache_key']
+        if key1 is None or key2 is None:
+            return None
+        return (key1, key2) if key1[0] <= key2[0] else (key2, key1)
+    
+    def _block_candidates(self, target: Dict, candidates: List[Dict], max_results: int) -> List[Dict]:
+        """Keep candidates sharing the target's last name (exact or phonetic), or a location word within a decade of age"""
+        if len(candidates) < self.blocking_min_candidates:
+            return candidates
+        
+        last_id = target['last_id']
+        last_dm = target['last_dm']
+        words = target['loc_tokens']
+        decade = target['age'] // 10 if target['age'] else -1
+        if not last_id and not last_dm and not words:
+            return candidates  # Nothing to block on
+        
+        blocked = []
+        for cand in candidates:
+            # Name block
+            if (last_id and cand['last_id'] == last_id) or (last_dm and cand['last_dm'] == last_dm):
+                blocked.append(cand)
+                continue
+            
+            # Location block; a candidate with an unknown location or age stays eligible on that field
+            if not words:
+                continue
+            if cand['loc_tokens'] and words.isdisjoint(cand['loc_tokens']):
+                continue
+            if decade >= 0 and cand['age'] and abs(cand['age'] // 10 - decade) > 1:
+                continue
+            blocked.append(cand)
+        
+        if len(blocked) < max_results:
+            return candidates  # Block too small to fill the result list
+        return blocked
+    
     async def find_matches(self, target_user_id: str, all_users: List[Dict], max_results: int = 50, min_confidence: float = 0.1, match_context: str = "general") -> List[Dict]:
         """Find matches for a target user with specific context"""
         target_user = None
@@ -463,32 +712,188 @@ class RealMatchingEngine:
         if not target_user:
             logger.error(f"Target user {target_user_id} not found")
             return []
+        if max_results <= 0:
+            return []
         
-        matches = []
-        
-        for candidate in candidate_users:
-            match_result = await self.calculate_match_with_context(target_user, candidate, match_context)
-            if match_result['confidence_score'] >= min_confidence:
-                matches.append(match_result)
-        
-        # Sort by confidence score (descending)
-        matches.sort(key=lambda x: x['confidence_score'], reverse=True)
+        # Normalize every user once instead of once per pair
+        self._reset_interned_if_full()
+        target_prep = self._prepare(target_user)
+        cand_preps = [self._prepare(c) for c in candidate_users]
+        cand_preps = self._block_candidates(target_prep, cand_preps, max_results)
+        self._assign_interest_masks([target_prep] + cand_preps)
+        cand_arrays = self._candidate_arrays(cand_preps)
+        age_scores, temporal_scores = self.batch_proximity_scores(target_prep, cand_arrays)
+        gender_scores = self.batch_gender_scores(target_prep, cand_arrays)
+        
+        # Component scores per candidate, without reasons (rapidfuzz steps stay in Python)
+        n = len(cand_preps)
+        name_arr = np.empty(n)
+        location_arr = np.empty(n)
+        demo_arr = np.empty(n)
+        interests_arr = np.empty(n)
+        temporal_arr = np.empty(n)
+        fuzzy_scores: List[Optional[Tuple[float, float]]] = [None] * n  # (first name, profession)
+        weights = self._weight_vector()
+        weights_tuple = tuple(weights.tolist())
+        for i, cand_prep in enumerate(cand_preps):
+            # Temporal proximity is not symmetric (whole days are floored), so it stays out of the cache
+            temporal_arr[i] = temporal_scores[i]
+            pair_key = self._pair_key(target_prep, cand_prep)
+            cached = self._pair_cache.get(pair_key) if pair_key else None
+            if cached is None:
+                scores = self._score_only(
+                    target_prep, cand_prep, age_scores[i], temporal_scores[i], gender_scores[i],
+                    weights_tuple, min_confidence
+                )
+                if scores is None:
+                    # Cannot reach min_confidence; zeros keep it below the threshold
+                    name_arr[i] = location_arr[i] = demo_arr[i] = interests_arr[i] = 0.0
+                    continue
+                cached = scores[:4] + scores[5:]
+                if pair_key:
+                    if len(self._pair_cache) >= self.max_cached_pairs:
+                        self._pair_cache.clear()
+                    self._pair_cache[pair_key] = cached
+            name_arr[i], location_arr[i], demo_arr[i], interests_arr[i] = cached[:4]
+            fuzzy_scores[i] = cached[4:]
+        
+        # Weighted overall score for every candidate
+        overall = (
+            name_arr * weights[0] +
+            location_arr * weights[1] +
+            demo_arr * weights[2] +
+            interests_arr * weights[3] +
+            temporal_arr * weights[4]
+        )
         
-        return matches[:max_results]
+        # Top max_results above the threshold by reported (rounded) confidence, ties in candidate order
+        confidence = np.array([round(score, 3) for score in overall.tolist()])
+        rows = np.flatnonzero(confidence >= min_confidence)
+        if len(rows) > max_results:
+            kth = len(rows) - max_results
+            cutoff = np.partition(confidence[rows], kth)[kth]
+            above = rows[confidence[rows] > cutoff]
+            ties = rows[confidence[rows] == cutoff][:max_results - len(above)]
+            rows = np.sort(np.concatenate([above, ties]))
+        rows = rows[np.argsort(-confidence[rows], kind='stable')]
+        
+        # Reasons and the result dict only for the returned matches, reusing the fuzzy scores (cached or fresh)
+        matches = []
+        for i in rows.tolist():
+            first_similarity, prof_score = fuzzy_scores[i] or (None, None)
+            scores, all_reasons = self._score_components(
+                target_prep, cand_preps[i], age_scores[i], temporal_scores[i], gender_scores[i],
+                first_similarity, prof_score
+            )
+            matches.append(self._build_match(
+                target_prep, cand_preps[i], float(overall[i]), scores, all_reasons, match_context
+            ))
+        return matches
     
-    async def calculate_match(self, user1: Dict, user2: Dict) -> Dict:
+    def calculate_match(self, user1: Dict, user2: Dict) -> Dict:
         """Calculate comprehensive match between two users (general context)"""
-        return await self.calculate_match_with_context(user1, user2, "general")
+        return self.calculate_match_with_context(user1, user2, "general")
     
-    async def calculate_match_with_context(self, user1: Dict, user2: Dict, match_context: str = "general") -> Dict:
+    def calculate_match_with_context(self, user1: Dict, user2: Dict, match_context: str = "general") -> Dict:
         """Calculate comprehensive match between two users with specific context"""
+        self._reset_interned_if_full()
+        prep1, prep2 = self._prepare(user1), self._prepare(user2)
+        self._assign_interest_masks([prep1, prep2])
+        return self._match_prepared(prep1, prep2, match_context)
+    
+    def _weight_vector(self) -> np.ndarray:
+        """Component weights in the order of the find_matches score arrays"""
+        return np.array([
+            self.weights['name_similarity'],
+            self.weights['location_proximity'],
+            self.weights['demographic_match'],
+            self.weights['interests_overlap'],
+            self.weights['temporal_proximity']
+        ])
+    
+    def _score_only(
+        self,
+        user1: Dict,
+        user2: Dict,
+        age_score: Optional[float] = None,
+        temporal_score: Optional[float] = None,
+        gender_score: Optional[float] = None,
+        weights: Optional[Tuple[float, ...]] = None,
+        min_score: float = 0.0
+    ) -> Optional[Tuple[float, float, float, float, float, float, float]]:
+        """Same component scores as _score_components, without reason strings
+        
+        Returns the five component scores followed by the first name and profession
+        similarities, so reasons can later be built without repeating the rapidfuzz steps.
+        With weights given, returns None as soon as the overall score cannot reach min_score
+        (checked before the rapidfuzz steps, like rapidfuzz's own score_cutoff).
+        """
+        location_score = self._location_score(user1, user2)
+        interests_score = self._interests_score(user1, user2)
+        
+        if age_score is None:
+            age_score = self.calculate_age_proximity(user1, user2)
+        if gender_score is None:
+            gender_score = self.calculate_gender_compatibility(user1, user2)
+        if temporal_score is None:
+            temporal_score = self.calculate_temporal_proximity(user1, user2)[0]
+        
+        # Upper bound with the name and profession parts at their maximum
+        if weights is not None:
+            demo_bound = min((age_score * 0.5 if age_score > 0 else 0.0) + gender_score * 0.3 + 0.2, 1.0)
+            bound = (
+                weights[0] +
+                location_score * weights[1] +
+                demo_bound * weights[2] +
+                interests_score * weights[3] +
+                temporal_score * weights[4]
+            )
+            if round(bound, 3) < min_score:
+                return None
+        
+        first_similarity = self.calculate_first_name_similarity(user1, user2)
+        prof_score = self.calculate_professional_match(user1, user2)
+        name_score = self._name_score(user1, user2, first_similarity)
+        demo_score = self._demographic_score(user1, user2, age_score, gender_score, prof_score)
         
-        # Calculate individual similarity scores
-        name_score, name_reasons = self.calculate_name_similarity(user1, user2)
+        return (
+            name_score, location_score, demo_score, interests_score, temporal_score,
+            first_similarity, prof_score
+        )
+    
+    def _score_components(
+        self,
+        user1: Dict,
+        user2: Dict,
+        age_score: Optional[float] = None,
+        temporal_score: Optional[float] = None,
+        gender_score: Optional[float] = None,
+        first_similarity: Optional[float] = None,
+        prof_score: Optional[float] = None
+    ) -> Tuple[Tuple[float, float, float, float, float], List[str]]:
+        """Individual similarity scores and reasons for two prepared users"""
+        name_score, name_reasons = self.calculate_name_similarity(user1, user2, first_similarity)
         location_score, location_reasons = self.calculate_location_proximity(user1, user2)
-        demo_score, demo_reasons = self.calculate_demographic_match(user1, user2)
+        demo_score, demo_reasons = self.calculate_demographic_match(
+            user1, user2, age_score, gender_score, prof_score
+        )
         interests_score, interests_reasons = self.calculate_interests_overlap(user1, user2)
-        temporal_score, temporal_reasons = self.calculate_temporal_proximity(user1, user2)
+        temporal_score, temporal_reasons = self.calculate_temporal_proximity(user1, user2, temporal_score)
+        
+        scores = (name_score, location_score, demo_score, interests_score, temporal_score)
+        return scores, name_reasons + location_reasons + demo_reasons + interests_reasons + temporal_reasons
+    
+    def _match_prepared(
+        self,
+        user1: Dict,
+        user2: Dict,
+        match_context: str = "general",
+        age_score: Optional[float] = None,
+        temporal_score: Optional[float] = None
+    ) -> Dict:
+        """Calculate a match between two users already passed through _prepare"""
+        scores, all_reasons = self._score_components(user1, user2, age_score, temporal_score)
+        name_score, location_score, demo_score, interests_score, temporal_score = scores
         
         # Calculate weighted overall score
         overall_score = (
@@ -498,15 +903,25 @@ class RealMatchingEngine:
             interests_score * self.weights['interests_overlap'] +
             temporal_score * self.weights['temporal_proximity']
         )
+        return self._build_match(user1, user2, overall_score, scores, all_reasons, match_context)
+    
+    def _build_match(
+        self,
+        user1: Dict,
+        user2: Dict,
+        overall_score: float,
+        scores: Tuple[float, float, float, float, float],
+        all_reasons: List[str],
+        match_context: str = "general"
+    ) -> Dict:
+        """Assemble the match result from already computed scores"""
+        name_score, location_score, demo_score, interests_score, temporal_score = scores
         
         # Predict relationship type with context
         match_type, predicted_relationship, relationship_confidence = self.predict_relationship_type(
             user1, user2, overall_score, name_score, match_context
         )
         
-        # Combine all reasons
-        all_reasons = name_reasons + location_reasons + demo_reasons + interests_reasons + temporal_reasons
-        
         # Determine confidence level
         if overall_score >= 0.8:
             confidence_level = "high"
@@ -530,4 +945,4 @@ class RealMatchingEngine:
             "match_reasons": all_reasons[:5],  # Top 5 reasons
             "predicted_relationship": predicted_relationship,
             "relationship_confidence": round(relationship_confidence, 3)
-        }
\ No newline at end of file
+        }
@@ -17,14 +17,42 @@ import logging
 import numpy as np
 import tensorflow as tf
 import tensorflow_recommenders as tfrs
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, Text, Callable, AsyncIterator, Union
 import pickle
 import os
+import platform
 from datetime import datetime
 import asyncio
 
+# Optional ANN index over user embeddings
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
 logger = logging.getLogger(__name__)
 
+def _cpu_flags() -> set:
+    """CPU feature flags from /proc/cpuinfo ("flags" on x86, "Features" on ARM)."""
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith(("flags", "Features")):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+def int8_inference_supported() -> bool:
+    """Whether this CPU has fast INT8 dot products (ARM, or x86 with VNNI / AMX-INT8)."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return True
+    return bool(_cpu_flags() & {"avx_vnni", "avx512_vnni", "amx_int8"})
+
+def bf16_inference_supported() -> bool:
+    """Whether this CPU has native BF16 arithmetic (AVX512-BF16, AMX-BF16 or ARM BF16)."""
+    return bool(_cpu_flags() & {"avx512_bf16", "amx_bf16", "bf16"})
+
 class YoFamNeuralCollaborativeFilter(tfrs.Model):
     """
     Custom Neural Collaborative Filtering model for family matching.
@@ -33,26 +61,22 @@ class YoFamNeuralCollaborativeFilter(tfrs.Model):
     relationship likelihood between family members.
     """
     
+    # Hash buckets for user and item ids (rows of each embedding table)
+    vocab_size = 20000
+    
     def __init__(self, rating_weight: float = 1.0, retrieval_weight: float = 1.0):
         super().__init__()
         
-        # Define vocabularies
-        self.user_vocab = tf.keras.utils.StringLookup(mask_token=None)
-        self.item_vocab = tf.keras.utils.StringLookup(mask_token=None)
-        
         # Define embedding dimensions
         embedding_dimension = 256
         
-        # User and item embeddings
-        self.user_embedding = tf.keras.Sequential([
-            self.user_vocab,
-            tf.keras.layers.Embedding(self.user_vocab.vocabulary_size(), embedding_dimension)
-        ])
-        
-        self.item_embedding = tf.keras.Sequential([
-            self.item_vocab,
-            tf.keras.layers.Embedding(self.item_vocab.vocabulary_size(), embedding_dimension)
-        ])
+        # User and item embedding tables, indexed by hashed int64 ids
+        self.user_table = tf.Variable(
+            tf.random.normal([self.vocab_size, embedding_dimension], stddev=0.05), name="user_table"
+        )
+        self.item_table = tf.Variable(
+            tf.random.normal([self.vocab_size, embedding_dimension], stddev=0.05), name="item_table"
+        )
         
         # Neural network layers for relationship prediction
         self.rating_model = tf.keras.Sequential([
@@ -64,11 +88,9 @@ class YoFamNeuralCollaborativeFilter(tfrs.Model):
             tf.keras.layers.Dense(1, activation="sigmoid")
         ])
         
-        # Retrieval task for candidate generation
+        # Retrieval task for candidate generation (in-batch top-k, FactorizedTopK needs a candidate corpus)
         self.retrieval_task = tfrs.tasks.Retrieval(
-            metrics=tfrs.metrics.FactorizedTopK(
-                metrics=[tf.keras.metrics.TopKCategoricalAccuracy(k=10)]
-            )
+            batch_metrics=[tf.keras.metrics.TopKCategoricalAccuracy(k=10)]
         )
         
         # Rating prediction task
@@ -80,10 +102,15 @@ class YoFamNeuralCollaborativeFilter(tfrs.Model):
         self.rating_weight = rating_weight
         self.retrieval_weight = retrieval_weight
     
+    @classmethod
+    def hash_ids(cls, ids: Any) -> tf.Tensor:
+        """Map string user/item ids to int64 table rows (FarmHash, stable across processes)."""
+        return tf.strings.to_hash_bucket_fast(ids, cls.vocab_size)
+    
     def call(self, features: Dict[str, tf.Tensor]) -> tf.Tensor:
-        """Forward pass of the model."""
-        user_embeddings = self.user_embedding(features["user_id"])
-        positive_item_embeddings = self.item_embedding(features["item_id"])
+        """Forward pass of the model on hashed int64 user_id / item_id."""
+        user_embeddings = tf.nn.embedding_lookup(self.user_table, features["user_id"])
+        positive_item_embeddings = tf.nn.embedding_lookup(self.item_table, features["item_id"])
         
         # Concatenate embeddings for rating prediction
         concatenated = tf.concat([user_embeddings, positive_item_embeddings], axis=1)
@@ -109,7 +136,7 @@ class YoFamNeuralCollaborativeFilter(tfrs.Model):
         retrieval_loss = self.retrieval_task(
             query_embeddings=predictions["user_embedding"],
             candidate_embeddings=predictions["item_embedding"],
-            candidate_identifiers=features["item_id"]
+            candidate_ids=features["item_id"]
         )
         
         return (
@@ -125,7 +152,7 @@ class FamilyFeatureEmbedding(tf.keras.Model):
     into dense vector representations for similarity computation.
     """
     
-    def __init__(self, feature_dims: Dict[str, int], embedding_dim: int = 128):
+    def __init__(self, feature_dims: Dict[str, int], embedding_dim: int = 128, dtype_policy: Optional[str] = None):
         super().__init__()
         self.embedding_dim = embedding_dim
         self.feature_embeddings = {}
@@ -133,27 +160,34 @@ class FamilyFeatureEmbedding(tf.keras.Model):
         # Create embedding layers for each feature
         for feature_name, vocab_size in feature_dims.items():
             self.feature_embeddings[feature_name] = tf.keras.layers.Embedding(
-                vocab_size, embedding_dim, name=f"{feature_name}_embedding"
+                vocab_size, embedding_dim, name=f"{feature_name}_embedding", dtype=dtype_policy
             )
         
         # Attention mechanism to weight features
         self.attention = tf.keras.layers.MultiHeadAttention(
-            num_heads=8, key_dim=embedding_dim
+            num_heads=8, key_dim=embedding_dim, dtype=dtype_policy
         )
         
-        # Final dense layers
+        # Final dense layers (the tanh output stays float32 under a mixed policy)
         self.dense_layers = tf.keras.Sequential([
-            tf.keras.layers.Dense(512, activation='relu'),
-            tf.keras.layers.BatchNormalization(),
-            tf.keras.layers.Dropout(0.3),
-            tf.keras.layers.Dense(256, activation='relu'),
-            tf.keras.layers.BatchNormalization(),
-            tf.keras.layers.Dropout(0.2),
-            tf.keras.layers.Dense(embedding_dim, activation='tanh')
+            tf.keras.layers.Dense(512, activation='relu', dtype=dtype_policy),
+            tf.keras.layers.BatchNormalization(dtype=dtype_policy),
+            tf.keras.layers.Dropout(0.3, dtype=dtype_policy),
+            tf.keras.layers.Dense(256, activation='relu', dtype=dtype_policy),
+            tf.keras.layers.BatchNormalization(dtype=dtype_policy),
+            tf.keras.layers.Dropout(0.2, dtype=dtype_policy),
+            tf.keras.layers.Dense(embedding_dim, activation='tanh', dtype='float32')
         ])
     
     def call(self, features: Dict[str, tf.Tensor], training=False) -> tf.Tensor:
         """Generate family feature embeddings."""
+        pooled = self.pool(features, training=training)
+        
+        # Final dense transformation
+        return self.dense_layers(pooled, training=training)
+    
+    def pool(self, features: Dict[str, tf.Tensor], training=False) -> tf.Tensor:
+        """Embed, attend and average the features (input to the dense stack)."""
         embeddings = []
         
         for feature_name, tensor in features.items():
@@ -173,10 +207,7 @@ class FamilyFeatureEmbedding(tf.keras.Model):
         )
         
         # Global average pooling
-        pooled = tf.reduce_mean(attended_embeddings, axis=1)
-        
-        # Final dense transformation
-        return self.dense_layers(pooled, training=training)
+        return tf.reduce_mean(attended_embeddings, axis=1)
 
 class TensorFlowMatchingEngine:
     """
@@ -186,13 +217,64 @@ class TensorFlowMatchingEngine:
     family relationship prediction and matching.
     """
     
-    def __init__(self, model_dir: str = "models/tensorflow"):
+    # Profile fields encoded for the embedding model, in signature order
+    categorical_features = (
+        "first_name", "last_name", "location", "profession",
+        "cultural_background", "primary_language"
+    )
+    # Hash buckets per feature, matching the embedding vocabulary sizes
+    feature_buckets = (10000, 10000, 5000, 1000, 500, 200)
+    # Match type by confidence bucket; a score equal to a threshold stays in the lower bucket
+    match_type_thresholds = np.array([0.6, 0.8])
+    match_types = np.array(["community", "friend", "family"])
+    
+    def __init__(
+        self,
+        model_dir: str = "models/tensorflow",
+        candidate_loader: Optional[Callable[[], AsyncIterator[Dict[str, Any]]]] = None
+    ):
         self.model_dir = model_dir
+        # Streams the matching candidates to index (e.g. DatabaseManager.iter_matching_candidates)
+        self.candidate_loader = candidate_loader
         self.collaborative_model: Optional[YoFamNeuralCollaborativeFilter] = None
         self.embedding_model: Optional[FamilyFeatureEmbedding] = None
+        
+        # Collaborative serving: memory-mapped user/item tables [vocab_size, 256] and the exported
+        # rating head signature, with the loaded SavedModel that owns the variables it reads
+        self._user_table: Optional[np.ndarray] = None
+        self._item_table: Optional[np.ndarray] = None
+        self._collaborative_serving = None
+        self._collaborative_saved = None
         self.is_initialized = False
         self.model_version = "1.0.0"
         
+        # Traced embedding forward pass, one int64 id vector per categorical feature
+        self._embed_batch = None
+        
+        # INT8 TFLite copy of the dense stack, used instead of FP32 on CPUs with fast INT8
+        self._dense_int8: Optional[tf.lite.Interpreter] = None
+        
+        # BF16 compute for new embedding models where the CPU has it natively
+        self.use_bf16 = bf16_inference_supported()
+        
+        # Cross-request batching of embedding calls from find_matches
+        self.max_batch_size = 32
+        self.batch_timeout_micros = 5000
+        self._embed_queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        
+        # Matches returned per query
+        self.top_k = 50
+        
+        # HNSW index over all indexed users' normalized embeddings, rows aligned with _ann_user_ids
+        self.ann_index = None
+        self.ann_k = 100
+        self._ann_user_ids: List[str] = []
+        
+        # Periodic re-index so users registered since the last build show up in matches
+        self.ann_refresh_interval = 3600.0
+        self._ann_refresh_task: Optional[asyncio.Task] = None
+        
         # Create model directory
         os.makedirs(model_dir, exist_ok=True)
         
@@ -209,6 +291,17 @@ class TensorFlowMatchingEngine:
             # Load or create feature embedding model
             await self._load_or_create_embedding_model()
             
+            # Trace the batched inference path once and start the batching worker
+            self._build_inference_function()
+            self._load_ann_index()
+            if self.ann_index is None:
+                await self.refresh_ann_index()
+            if self._batch_task is None:
+                self._embed_queue = asyncio.Queue()
+                self._batch_task = asyncio.get_running_loop().create_task(self._batch_embeddings())
+            if self.candidate_loader is not None and self._ann_refresh_task is None:
+                self._ann_refresh_task = asyncio.get_running_loop().create_task(self._refresh_ann_index_loop())
+            
             self.is_initialized = True
             logger.info("✅ TensorFlow models loaded successfully")
             
@@ -222,65 +315,188 @@ class TensorFlowMatchingEngine:
         
         try:
             if os.path.exists(model_path):
-                self.collaborative_model = tf.keras.models.load_model(model_path)
+                # Prefer the memory-mapped serving files; the full model is restored only for retraining
+                if not self._load_collaborative_serving():
+                    self.collaborative_model = self._restore_collaborative_model(model_path)
                 logger.info("Loaded existing collaborative filtering model")
             else:
-                # Create new model with dummy data for initialization
-                self.collaborative_model = YoFamNeuralCollaborativeFilter()
+                self.collaborative_model = self._create_collaborative_model()
                 logger.info("Created new collaborative filtering model")
-                
-                # Initialize with dummy data
-                dummy_features = {
-                    "user_id": tf.constant(["user1", "user2"]),
-                    "item_id": tf.constant(["item1", "item2"]),
-                    "rating": tf.constant([1.0, 0.8])
-                }
-                
-                # Build the model
-                _ = self.collaborative_model(dummy_features)
-                
+        
         except Exception as e:
             logger.error(f"Error loading collaborative model: {str(e)}")
             # Create fallback model
             self.collaborative_model = YoFamNeuralCollaborativeFilter()
     
+    @staticmethod
+    def _create_collaborative_model() -> YoFamNeuralCollaborativeFilter:
+        """New collaborative model, built on dummy hashed ids."""
+        model = YoFamNeuralCollaborativeFilter()
+        dummy_features = {
+            "user_id": YoFamNeuralCollaborativeFilter.hash_ids(["user1", "user2"]),
+            "item_id": YoFamNeuralCollaborativeFilter.hash_ids(["item1", "item2"]),
+            "rating": tf.constant([1.0, 0.8])
+        }
+        _ = model(dummy_features)
+        return model
+    
+    def _restore_collaborative_model(self, model_path: str) -> YoFamNeuralCollaborativeFilter:
+        """Collaborative model with the weights of a saved model (the SavedModel has no Keras metadata)."""
+        model = self._create_collaborative_model()
+        model.load_weights(os.path.join(model_path, "variables", "variables")).expect_partial()
+        return model
+    
+    def _collaborative_serving_paths(self) -> Tuple[str, str, str]:
+        """Locations of the user table, item table and rating head exported for serving."""
+        return (
+            os.path.join(self.model_dir, "collaborative_user_table.npy"),
+            os.path.join(self.model_dir, "collaborative_item_table.npy"),
+            os.path.join(self.model_dir, "collaborative_rating")
+        )
+    
+    def _load_collaborative_serving(self) -> bool:
+        """Memory-map the exported id tables and load the rating head signature, if they were saved."""
+        user_path, item_path, rating_path = self._collaborative_serving_paths()
+        if not all(os.path.exists(path) for path in (user_path, item_path, rating_path)):
+            return False
+        
+        # Only the table pages that lookups touch are read from disk
+        self._user_table = np.load(user_path, mmap_mode="r")
+        self._item_table = np.load(item_path, mmap_mode="r")
+        self._collaborative_saved = tf.saved_model.load(rating_path)
+        self._collaborative_serving = self._collaborative_saved.signatures["serving_default"]
+        return True
+    
     async def _load_or_create_embedding_model(self):
         """Load existing embedding model or create new one."""
         model_path = os.path.join(self.model_dir, "embedding_model")
         
         try:
+            self.embedding_model = self._create_embedding_model()
             if os.path.exists(model_path):
-                self.embedding_model = tf.keras.models.load_model(model_path)
+                # Restore the saved weights into the Python model, which keeps pool() for the INT8 split
+                self.embedding_model.load_weights(
+                    os.path.join(model_path, "variables", "variables")
+                ).assert_existing_objects_matched()
                 logger.info("Loaded existing embedding model")
             else:
-                # Create new embedding model
-                feature_dims = {
-                    "first_name": 10000,
-                    "last_name": 10000,
-                    "location": 5000,
-                    "profession": 1000,
-                    "cultural_background": 500,
-                    "language": 200
-                }
-                
-                self.embedding_model = FamilyFeatureEmbedding(feature_dims)
                 logger.info("Created new embedding model")
-                
-                # Initialize with dummy data
-                dummy_features = {
-                    "first_name": tf.constant([1, 2]),
-                    "last_name": tf.constant([10, 20]),
-                    "location": tf.constant([100, 200])
-                }
-                
-                # Build the model
-                _ = self.embedding_model(dummy_features)
-                
+        
         except Exception as e:
             logger.error(f"Error loading embedding model: {str(e)}")
             # Create fallback model
             feature_dims = {"default": 1000}
             self.embedding_model = FamilyFeatureEmbedding(feature_dims)
+        
+        self._load_dense_int8()
+    
+    def _create_embedding_model(self) -> FamilyFeatureEmbedding:
+        """New embedding model, built on the [B] int64 feature ids the traced inference path feeds it."""
+        feature_dims = {
+            "first_name": 10000,
+            "last_name": 10000,
+            "location": 5000,
+            "profession": 1000,
+            "cultural_background": 500,
+            "language": 200
+        }
+        
+        model = FamilyFeatureEmbedding(
+            feature_dims, dtype_policy="mixed_bfloat16" if self.use_bf16 else None
+        )
+        dummy_ids = self._encode_features([["unknown"] * len(self.categorical_features)] * 2)
+        _ = model(dict(zip(self.categorical_features, tf.unstack(dummy_ids, axis=1))))
+        return model
+    
+    def _build_inference_function(self):
+        """Trace the embedding model into a concrete function over [B, F] int64 feature id batches."""
+        feature_names = self.categorical_features
+        model = self.embedding_model
+        # With the INT8 dense stack the traced part stops at the pooled features
+        forward = model.pool if self._dense_int8 is not None else model
+        
+        @tf.function(input_signature=[tf.TensorSpec(shape=[None, len(feature_names)], dtype=tf.int64)])
+        def embed_batch(bucket_ids):
+            feature_ids = tf.unstack(bucket_ids, axis=1)
+            return forward(dict(zip(feature_names, feature_ids)), training=False)
+        
+        try:
+            self._embed_batch = embed_batch.get_concrete_function()
+        except Exception as e:
+            logger.error(f"Error tracing embedding model: {str(e)}")
+            self._embed_batch = None
+    
+    async def _batch_embeddings(self):
+        """Collect pending embedding requests and run them through one batched call."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._embed_queue.get()]
+            deadline = loop.time() + self.batch_timeout_micros / 1e6
+            try:
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._embed_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                self._fail_pending(batch, RuntimeError("TensorFlow engine closed"))
+                raise
+            
+            try:
+                embeddings = self._generate_user_embedding_batch(tf.stack([features for features, _ in batch]))
+            except Exception as e:
+                self._fail_pending(batch, e)
+                continue
+            
+            # Scatter the [B, 128] result back to the waiting callers
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(embeddings[i:i + 1])
+    
+    @staticmethod
+    def _fail_pending(batch: List[Tuple[tf.Tensor, asyncio.Future]], error: Exception):
+        """Fail the futures of queued embedding requests that will not be served."""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+    
+    async def close(self):
+        """Stop the background tasks and fail embedding requests still waiting on the batching worker."""
+        for task in (self._batch_task, self._ann_refresh_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._batch_task = None
+        self._ann_refresh_task = None
+        
+        if self._embed_queue is not None:
+            pending = []
+            while not self._embed_queue.empty():
+                pending.append(self._embed_queue.get_nowait())
+            self._fail_pending(pending, RuntimeError("TensorFlow engine closed"))
+            self._embed_queue = None
+        
+        self.is_initialized = False
+        logger.info("TensorFlow engine closed")
+    
+    async def _embed_queued(self, features: tf.Tensor) -> tf.Tensor:
+        """Embed one user through the cross-request batching queue."""
+        if self._embed_queue is None:
+            return self._generate_user_embedding(features)
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._embed_queue.put((features, future))
+        try:
+            return await future
+        except Exception as e:
+            logger.error(f"Error generating embedding: {str(e)}")
+            return tf.random.normal([1, 128])
     
     async def find_matches(self, user_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -299,29 +515,32 @@ class TensorFlowMatchingEngine:
             # Extract features for embedding
             features = self._extract_features(user_profile)
             
-            # Generate user embedding
-            user_embedding = await self._generate_user_embedding(features)
+            # Generate user embedding (batched with concurrent requests)
+            user_embedding = await self._embed_queued(features)
             
-            # Find similar users using collaborative filtering
-            similar_users = await self._find_similar_users(user_embedding, user_profile["user_id"])
+            # Most similar users by cosine similarity, highest first
+            similar_users, similarities = self._find_similar_users(user_embedding, user_profile["user_id"])
+            top_users, confidences = similar_users[:self.top_k], similarities[:self.top_k]
+            match_types = self._determine_match_types(confidences)
+            
+            # Relationship likelihood from the collaborative model, one batched call for all matches
+            likelihoods = self._relationship_likelihoods(user_profile["user_id"], top_users)
             
             # Calculate confidence scores
             matches = []
-            for similar_user in similar_users:
-                confidence = await self._calculate_neural_similarity(
-                    user_embedding, similar_user["embedding"]
-                )
-                
-                matches.append({
+            for i, (confidence, similar_user, match_type) in enumerate(
+                zip(confidences.tolist(), top_users, match_types.tolist())
+            ):
+                match = {
                     "user_id": similar_user["user_id"],
-                    "confidence_score": float(confidence),
-                    "match_type": self._determine_match_type(confidence),
+                    "confidence_score": confidence,
+                    "match_type": match_type,
                     "features_matched": similar_user.get("features_matched", []),
                     "model_source": "tensorflow_deep_learning"
-                })
-            
-            # Sort by confidence
-            matches.sort(key=lambda x: x["confidence_score"], reverse=True)
+                }
+                if likelihoods is not None:
+                    match["relationship_likelihood"] = likelihoods[i]
+                matches.append(match)
             
             logger.info(f"TensorFlow engine found {len(matches)} matches")
             return matches
@@ -330,74 +549,197 @@ class TensorFlowMatchingEngine:
             logger.error(f"TensorFlow matching error: {str(e)}")
             return []
     
-    def _extract_features(self, user_profile: Dict[str, Any]) -> Dict[str, tf.Tensor]:
-        """Extract and encode features for TensorFlow model."""
-        features = {}
-        
-        # Extract categorical features
-        categorical_features = [
-            "first_name", "last_name", "location", "profession",
-            "cultural_background", "primary_language"
-        ]
-        
-        for feature in categorical_features:
-            value = user_profile.get(feature, "unknown")
-            # Simple hash-based encoding (in production, use proper vocabulary)
-            encoded_value = hash(str(value)) % 10000
-            features[feature] = tf.constant([encoded_value])
-        
-        return features
+    def _relationship_likelihoods(self, user_id: str, users: List[Dict[str, Any]]) -> Optional[List[float]]:
+        """Collaborative likelihood for each matched user, or None when the model cannot score them."""
+        try:
+            return self.predict_ratings(
+                [str(user_id)] * len(users), [str(user["user_id"]) for user in users]
+            ).tolist()
+        except Exception as e:
+            logger.error(f"Error predicting relationship likelihood: {str(e)}")
+            return None
+    
+    def _extract_features(self, user_profile: Dict[str, Any]) -> tf.Tensor:
+        """Extract and encode features for TensorFlow model as one [F] int64 bucket id vector."""
+        values = [str(user_profile.get(feature, "unknown")) for feature in self.categorical_features]
+        return self._encode_features(values)
     
-    async def _generate_user_embedding(self, features: Dict[str, tf.Tensor]) -> tf.Tensor:
+    def _encode_features(self, values: List[Any]) -> tf.Tensor:
+        """Hash [F] or [B, F] feature strings to per-feature bucket ids in one op."""
+        # FarmHash fingerprint, stable across processes unlike Python's hash()
+        fingerprints = tf.strings.to_hash_bucket_fast(tf.constant(values), 2 ** 62)
+        return tf.math.floormod(fingerprints, tf.constant(self.feature_buckets, dtype=tf.int64))
+    
+    def _generate_user_embedding_batch(self, bucket_ids: tf.Tensor) -> tf.Tensor:
+        """Run the traced embedding function on a [B, F] batch of feature bucket ids."""
+        if self._embed_batch is None:
+            raise RuntimeError("Embedding inference function not built")
+        output = self._embed_batch(bucket_ids)
+        if self._dense_int8 is not None:
+            output = self._run_dense_int8(output.numpy())
+        return output
+    
+    def _run_dense_int8(self, pooled: np.ndarray) -> tf.Tensor:
+        """Run the INT8 dense stack (up to the output logits) on a [B, embedding_dim] batch of pooled features."""
+        interpreter = self._dense_int8
+        input_detail = interpreter.get_input_details()[0]
+        if tuple(input_detail["shape"]) != pooled.shape:
+            interpreter.resize_tensor_input(input_detail["index"], pooled.shape)
+            interpreter.allocate_tensors()
+        interpreter.set_tensor(input_detail["index"], pooled.astype(np.float32))
+        interpreter.invoke()
+        return tf.tanh(interpreter.get_tensor(interpreter.get_output_details()[0]["index"]))
+    
+    def _generate_user_embedding(self, features: tf.Tensor) -> tf.Tensor:
         """Generate dense embedding for user."""
         try:
-            embedding = self.embedding_model(features)
-            return embedding
+            return self._generate_user_embedding_batch(features[tf.newaxis])
         except Exception as e:
             logger.error(f"Error generating embedding: {str(e)}")
             # Return random embedding as fallback
             return tf.random.normal([1, 128])
     
-    async def _find_similar_users(self, user_embedding: tf.Tensor, user_id: str) -> List[Dict[str, Any]]:
-        """Find similar users using vector similarity."""
-        # In production, this would query a vector database
-        # For now, return mock similar users
+    def _find_similar_users(self, user_embedding: tf.Tensor, user_id: str) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Find similar users and their cosine similarities, highest first."""
+        if self.ann_index is not None and self.ann_index.ntotal:
+            return self._find_similar_users_ann(user_embedding, user_id)
         
+        # Without an index, return mock similar users
         similar_users = []
         for i in range(5):  # Mock 5 similar users
-            similar_embedding = user_embedding + tf.random.normal([1, 128], stddev=0.1)
             similar_users.append({
                 "user_id": f"similar_user_{i}",
-                "embedding": similar_embedding,
                 "features_matched": ["location", "cultural_background"]
             })
+        similar_embeddings = user_embedding + tf.random.normal([len(similar_users), 128], stddev=0.1)
         
-        return similar_users
+        similarities = self._cosine_similarities(user_embedding, self._normalize_embeddings(similar_embeddings))
+        order = np.argsort(-similarities, kind="stable")
+        return [similar_users[row] for row in order.tolist()], similarities[order]
+    
+    def _find_similar_users_ann(self, user_embedding: tf.Tensor, user_id: str) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Nearest indexed users, scored by FAISS with the exact FP32 inner product of normalized embeddings."""
+        query = np.ascontiguousarray(self._normalize_embeddings(user_embedding).numpy(), dtype=np.float32)
+        similarities, rows = self.ann_index.search(query, min(self.ann_k, self.ann_index.ntotal))
+        keep = [i for i, row in enumerate(rows[0]) if row >= 0 and self._ann_user_ids[row] != user_id]
+        
+        users = [{"user_id": self._ann_user_ids[rows[0][i]], "features_matched": []} for i in keep]
+        return users, similarities[0][keep]
+    
+    @staticmethod
+    async def _profile_batches(
+        user_profiles: Union[List[Dict[str, Any]], AsyncIterator[Dict[str, Any]]],
+        batch_size: int
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Split a profile list or stream into lists of at most batch_size profiles."""
+        if isinstance(user_profiles, list):
+            for start in range(0, len(user_profiles), batch_size):
+                yield user_profiles[start:start + batch_size]
+            return
+        
+        batch = []
+        async for profile in user_profiles:
+            batch.append(profile)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
     
-    async def _calculate_neural_similarity(self, emb1: tf.Tensor, emb2: tf.Tensor) -> float:
-        """Calculate cosine similarity between embeddings."""
+    async def build_ann_index(
+        self,
+        user_profiles: Union[List[Dict[str, Any]], AsyncIterator[Dict[str, Any]]],
+        batch_size: int = 1024
+    ):
+        """Embed every profile (a stream one batch at a time) and index the normalized embeddings with FAISS HNSW."""
+        if faiss is None:
+            logger.warning("faiss not installed, similar users stay mocked")
+            return
+        
         try:
-            # Normalize embeddings
-            emb1_norm = tf.nn.l2_normalize(emb1, axis=-1)
-            emb2_norm = tf.nn.l2_normalize(emb2, axis=-1)
+            embeddings = []
+            user_ids = []
+            async for batch in self._profile_batches(user_profiles, batch_size):
+                bucket_ids = self._encode_features([
+                    [str(profile.get(feature, "unknown")) for feature in self.categorical_features]
+                    for profile in batch
+                ])
+                embeddings.append(self._generate_user_embedding_batch(bucket_ids).numpy())
+                user_ids.extend(str(profile.get("user_id", profile.get("_id"))) for profile in batch)
+                # Let queued requests run between batches during a background refresh
+                await asyncio.sleep(0)
+            
+            matrix = np.ascontiguousarray(
+                np.concatenate(embeddings) if embeddings else np.zeros((0, 128)), dtype=np.float32
+            )
+            faiss.normalize_L2(matrix)
             
-            # Calculate cosine similarity
-            similarity = tf.reduce_sum(emb1_norm * emb2_norm, axis=-1)
+            index = faiss.IndexHNSWFlat(matrix.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+            index.add(matrix)
             
-            return float(similarity.numpy()[0])
+            self.ann_index = index
+            self._ann_user_ids = user_ids
+            self._save_ann_index()
+            logger.info(f"Indexed {index.ntotal} user embeddings")
             
+        except Exception as e:
+            logger.error(f"Error building ANN index: {str(e)}")
+    
+    async def refresh_ann_index(self):
+        """Index the current matching candidates, when a candidate loader is configured."""
+        if self.candidate_loader is not None:
+            await self.build_ann_index(self.candidate_loader())
+    
+    async def _refresh_ann_index_loop(self):
+        """Re-index the matching candidates every ann_refresh_interval seconds."""
+        while True:
+            await asyncio.sleep(self.ann_refresh_interval)
+            try:
+                await self.refresh_ann_index()
+            except Exception as e:
+                logger.error(f"ANN index refresh error: {str(e)}")
+    
+    def _save_ann_index(self):
+        """Persist the ANN index and its row-to-user mapping."""
+        faiss.write_index(self.ann_index, os.path.join(self.model_dir, "user_embeddings.faiss"))
+        with open(os.path.join(self.model_dir, "user_embeddings_ids.pkl"), "wb") as f:
+            pickle.dump(self._ann_user_ids, f)
+    
+    def _load_ann_index(self):
+        """Load a persisted ANN index, if faiss is available and one was saved."""
+        index_path = os.path.join(self.model_dir, "user_embeddings.faiss")
+        ids_path = os.path.join(self.model_dir, "user_embeddings_ids.pkl")
+        if faiss is None or not os.path.exists(index_path) or not os.path.exists(ids_path):
+            return
+        
+        try:
+            # HNSWFlat keeps the vectors, so the index is the only copy of the embedding matrix
+            index = faiss.read_index(index_path)
+            with open(ids_path, "rb") as f:
+                self._ann_user_ids = pickle.load(f)
+            self.ann_index = index
+            logger.info(f"Loaded ANN index with {index.ntotal} user embeddings")
+        except Exception as e:
+            logger.error(f"Error loading ANN index: {str(e)}")
+    
+    @staticmethod
+    def _normalize_embeddings(embeddings: tf.Tensor) -> tf.Tensor:
+        """L2-normalize embedding rows."""
+        return tf.nn.l2_normalize(embeddings, axis=-1)
+    
+    def _cosine_similarities(self, user_embedding: tf.Tensor, candidates_norm: tf.Tensor) -> np.ndarray:
+        """Cosine similarity of one embedding against pre-normalized candidate rows."""
+        try:
+            query_norm = self._normalize_embeddings(user_embedding)
+            similarities = tf.matmul(query_norm, candidates_norm, transpose_b=True)
+            return similarities.numpy()[0]
         except Exception as e:
             logger.error(f"Similarity calculation error: {str(e)}")
-            return 0.5  # Default similarity
-    
-    def _determine_match_type(self, confidence: float) -> str:
-        """Determine match type based on confidence score."""
-        if confidence > 0.8:
-            return "family"
-        elif confidence > 0.6:
-            return "friend"
-        else:
-            return "community"
+            return np.full(int(candidates_norm.shape[0]), 0.5)  # Default similarity
+    
+    def _determine_match_types(self, confidences: np.ndarray) -> np.ndarray:
+        """Determine match types for an array of confidence scores (> 0.8 family, > 0.6 friend)."""
+        return self.match_types[np.searchsorted(self.match_type_thresholds, confidences, side="left")]
     
     async def retrain_model(self, training_data: List[Dict[str, Any]]):
         """Retrain models with new data."""
@@ -408,7 +750,7 @@ class TensorFlowMatchingEngine:
             dataset = self._prepare_training_dataset(training_data)
             
             # Compile model
-            self.collaborative_model.compile(
+            self._trainable_collaborative_model().compile(
                 optimizer=tf.keras.optimizers.Adam(learning_rate=0.001)
             )
             
@@ -429,6 +771,28 @@ class TensorFlowMatchingEngine:
             logger.error(f"Model retraining failed: {str(e)}")
             raise
     
+    def _trainable_collaborative_model(self) -> tf.keras.Model:
+        """Keras collaborative model for training, restored from disk on first use."""
+        if self.collaborative_model is None:
+            model_path = os.path.join(self.model_dir, "collaborative_model")
+            self.collaborative_model = self._restore_collaborative_model(model_path)
+        return self.collaborative_model
+    
+    def predict_ratings(self, user_ids: List[str], item_ids: List[str]) -> np.ndarray:
+        """Predicted relationship likelihood for (user, item) pairs."""
+        if not user_ids:
+            return np.empty(0, dtype=np.float32)
+        user_ids = YoFamNeuralCollaborativeFilter.hash_ids(user_ids)
+        item_ids = YoFamNeuralCollaborativeFilter.hash_ids(item_ids)
+        if self._collaborative_serving is not None:
+            predictions = self._collaborative_serving(
+                user_embedding=tf.convert_to_tensor(self._user_table[user_ids.numpy()]),
+                item_embedding=tf.convert_to_tensor(self._item_table[item_ids.numpy()])
+            )["rating_prediction"]
+        else:
+            predictions = self.collaborative_model({"user_id": user_ids, "item_id": item_ids})["rating_prediction"]
+        return predictions.numpy().reshape(-1)
+    
     def _prepare_training_dataset(self, training_data: List[Dict[str, Any]]) -> tf.data.Dataset:
         """Prepare TensorFlow dataset for training."""
         # Convert training data to TensorFlow dataset format
@@ -444,8 +808,8 @@ class TensorFlowMatchingEngine:
             ratings.append(sample.get("rating", 0.5))
         
         dataset_dict = {
-            "user_id": user_ids,
-            "item_id": item_ids,
+            "user_id": YoFamNeuralCollaborativeFilter.hash_ids(user_ids),
+            "item_id": YoFamNeuralCollaborativeFilter.hash_ids(item_ids),
             "rating": ratings
         }
         
@@ -457,19 +821,119 @@ class TensorFlowMatchingEngine:
     async def _save_models(self):
         """Save trained models to disk."""
         try:
-            # Save collaborative model
+            # Save the full collaborative model (restored for retraining)
             collab_path = os.path.join(self.model_dir, "collaborative_model")
-            self.collaborative_model.save(collab_path)
+            model = self.collaborative_model
+            tf.saved_model.save(model, collab_path)
+            
+            # Export the id tables as raw float32 arrays and the rating head with a fixed serving signature
+            user_path, item_path, rating_path = self._collaborative_serving_paths()
+            np.save(user_path, model.user_table.numpy())
+            np.save(item_path, model.item_table.numpy())
+            
+            rating_model = model.rating_model
+            embedding_spec = tf.TensorSpec(shape=[None, model.user_table.shape[1]], dtype=tf.float32)
+            
+            @tf.function(input_signature=[embedding_spec, embedding_spec])
+            def serve(user_embedding, item_embedding):
+                concatenated = tf.concat([user_embedding, item_embedding], axis=1)
+                return {"rating_prediction": rating_model(concatenated, training=False)}
+            
+            tf.saved_model.save(
+                rating_model, rating_path, signatures={"serving_default": serve.get_concrete_function()}
+            )
+            self._load_collaborative_serving()
             
             # Save embedding model
             embed_path = os.path.join(self.model_dir, "embedding_model")
             self.embedding_model.save(embed_path)
             
+            # INT8 copy of the dense stack for CPUs with fast INT8 kernels
+            self._save_dense_int8()
+            
+            # Re-index the current candidates with the saved models
+            await self.refresh_ann_index()
+            
             logger.info("Models saved successfully")
             
         except Exception as e:
             logger.error(f"Error saving models: {str(e)}")
     
+    def _dense_int8_path(self) -> str:
+        """Location of the quantized dense stack next to the saved models."""
+        return os.path.join(self.model_dir, "embedding_dense_int8.tflite")
+    
+    def _save_dense_int8(self):
+        """Post-training quantize the embedding dense stack to an INT8 TFLite model."""
+        model = self.embedding_model
+        try:
+            # Quantize up to the pre-tanh logits: a tanh output gets a fixed 1/128 INT8 step,
+            # which rounds small embedding components to zero; tanh is applied in float32
+            *hidden, output = self._float32_dense_stack().layers
+            
+            def logits(pooled):
+                for layer in hidden:
+                    pooled = layer(pooled, training=False)
+                return tf.matmul(pooled, output.kernel) + output.bias
+            
+            serve = tf.function(
+                logits, input_signature=[tf.TensorSpec([None, model.embedding_dim], tf.float32)]
+            )
+            
+            def calibration_data():
+                # Pooled activations for random feature ids, within each embedding's vocabulary
+                for _ in range(100):
+                    features = {
+                        name: tf.random.uniform([1], 0, layer.input_dim, dtype=tf.int64)
+                        for name, layer in model.feature_embeddings.items()
+                    }
+                    yield [tf.cast(model.pool(features), tf.float32)]
+            
+            converter = tf.lite.TFLiteConverter.from_concrete_functions(
+                [serve.get_concrete_function()], model.dense_layers
+            )
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = calibration_data
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            
+            # Convert before opening the file so a failed conversion leaves no empty model behind
+            tflite_model = converter.convert()
+            with open(self._dense_int8_path(), "wb") as f:
+                f.write(tflite_model)
+                
+        except Exception as e:
+            logger.error(f"Error quantizing embedding dense stack: {str(e)}")
+    
+    def _float32_dense_stack(self) -> tf.keras.Sequential:
+        """Float32 copy of the embedding dense stack; TFLite has no BF16 tensors for a mixed_bfloat16 model."""
+        dense = self.embedding_model.dense_layers
+        copy = tf.keras.Sequential([
+            type(layer).from_config({**layer.get_config(), "dtype": "float32"}) for layer in dense.layers
+        ])
+        copy.build([None, self.embedding_model.embedding_dim])
+        copy.set_weights(dense.get_weights())
+        return copy
+    
+    def _load_dense_int8(self):
+        """Use the INT8 dense stack only where INT8 kernels beat FP32."""
+        self._dense_int8 = None
+        path = self._dense_int8_path()
+        if not os.path.exists(path):
+            return
+        
+        if not int8_inference_supported():
+            logger.warning("No VNNI/AMX-INT8 on this CPU, INT8 kernels would be slower; keeping FP32 embedding model")
+            return
+        
+        try:
+            # The TFLite runtime applies the XNNPACK delegate by default
+            interpreter = tf.lite.Interpreter(model_path=path)
+            interpreter.allocate_tensors()
+            self._dense_int8 = interpreter
+            logger.info("Using INT8 TFLite dense stack for embeddings")
+        except Exception as e:
+            logger.error(f"Error loading INT8 dense stack, keeping FP32: {str(e)}")
+    
     async def health_check(self) -> bool:
         """Check if TensorFlow engine is healthy."""
         try:
@@ -496,7 +960,9 @@ class TensorFlowMatchingEngine:
         return {
             "model_version": self.model_version,
             "initialized": self.is_initialized,
-            "collaborative_model_loaded": self.collaborative_model is not None,
+            "collaborative_model_loaded": (
+                self.collaborative_model is not None or self._collaborative_serving is not None
+            ),
             "embedding_model_loaded": self.embedding_model is not None,
             "model_dir": self.model_dir
         }
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Tests for RealMatchingEngine.find_matches
+=========================================
+
+find_matches scores candidates in bulk (blocking, pair cache, top-k selection);
+its ranking must agree with scoring every pair through calculate_match_with_context.
+"""
+
+import asyncio
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from services.real_matching_engine import RealMatchingEngine
+
+FIRST_NAMES = ['John', 'Jon', 'Ahmed', 'Alice', 'Fatima', 'Mohammad', 'Sean', 'Marie', 'Maria', 'José']
+LAST_NAMES = ['Smith', 'Smyth', 'Hassan', 'Omar', 'Schmidt', 'Dupont', 'Cohen', 'Kohn']
+LOCATIONS = ['Boston, MA', 'Boston', 'New York City', 'Berlin, Germany', 'Lagos Nigeria', 'Paris France', '', None]
+PROFESSIONS = ['Software Engineer', 'Engineer, Software', 'Teacher', 'Doctor', None]
+INTERESTS = ['music', 'football', 'reading', 'chess', 'travel', 'cooking']
+
+
+def make_users(count, seed=1):
+    """Deterministic synthetic users with the fields the engine reads"""
+    rng = random.Random(seed)
+    users = []
+    for i in range(count):
+        users.append({
+            '_id': f'u{i}',
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'location': rng.choice(LOCATIONS),
+            'profession': rng.choice(PROFESSIONS),
+            'gender': rng.choice(['male', 'female', None]),
+            'interests': rng.sample(INTERESTS, rng.randint(0, 4)),
+            'date_of_birth': (date(1950, 1, 1) + timedelta(days=rng.randint(0, 25000))).isoformat(),
+            'created_at': (datetime(2024, 1, 1) + timedelta(hours=rng.randint(0, 24 * 200))).isoformat() + 'Z',
+            'updated_at': datetime(2024, 6, 1)
+        })
+    return users
+
+
+def brute_force_ranking(engine, target_id, users, max_results, min_confidence, match_context):
+    """(user_id, confidence_score) of the top matches, scoring every pair separately"""
+    target = next(user for user in users if user['_id'] == target_id)
+    scored = [
+        engine.calculate_match_with_context(target, user, match_context)
+        for user in users if user['_id'] != target_id
+    ]
+    scored = [match for match in scored if match['confidence_score'] >= min_confidence]
+    scored.sort(key=lambda match: match['confidence_score'], reverse=True)
+    return [(match['user_id'], match['confidence_score']) for match in scored[:max_results]]
+
+
+def ranking(matches):
+    return [(match['user_id'], match['confidence_score']) for match in matches]
+
+
+@pytest.mark.parametrize("user_count", [300, 1500])
+@pytest.mark.parametrize("match_context", ["general", "family"])
+def test_find_matches_agrees_with_brute_force(user_count, match_context):
+    # 1500 users puts the pool above blocking_min_candidates
+    users = make_users(user_count)
+    engine = RealMatchingEngine()
+
+    for target_id in ['u0', 'u1', 'u7']:
+        matches = asyncio.run(engine.find_matches(target_id, users, 10, 0.1, match_context))
+        expected = brute_force_ranking(RealMatchingEngine(), target_id, users, 10, 0.1, match_context)
+        assert ranking(matches) == expected
+
+
+def test_warm_pair_cache_returns_same_results():
+    users = make_users(1500, seed=2)
+    engine = RealMatchingEngine()
+
+    cold = [asyncio.run(engine.find_matches(target_id, users, 20)) for target_id in ['u0', 'u3']]
+    assert engine._pair_cache
+    warm = [asyncio.run(engine.find_matches(target_id, users, 20)) for target_id in ['u0', 'u3']]
+    uncached = [
+        asyncio.run(RealMatchingEngine().find_matches(target_id, [dict(user, updated_at=None) for user in users], 20))
+        for target_id in ['u0', 'u3']
+    ]
+
+    assert warm == cold
+    assert warm == uncached
+
+
+def test_blocking_keeps_same_name_in_other_location():
+    def user(user_id, first_name, last_name, location):
+        return {
+            '_id': user_id,
+            'first_name': first_name,
+            'last_name': last_name,
+            'location': location,
+            'date_of_birth': '1990-05-01',
+            'created_at': '2020-01-01T00:00:00Z'
+        }
+
+    users = [user('target', 'John', 'Smith', 'Boston'), user('relative', 'John', 'Smith', 'Chicago')]
+    users += [user(f'stone{i}', 'Zed', 'Stone', 'Boston') for i in range(1500)]
+
+    matches = asyncio.run(RealMatchingEngine().find_matches('target', users, 10))
+
+    assert matches[0]['user_id'] == 'relative'
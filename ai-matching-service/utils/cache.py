@@ -6,21 +6,27 @@ Manages caching with Redis fallback to in-memory cache for production flexibilit
 """
 
 import logging
-import json
+import orjson
 import asyncio
-from typing import Any, Optional, Dict
-from datetime import datetime, timedelta
+import heapq
+import time
+from typing import Any, Optional, Dict, List, Tuple
 import os
 
 logger = logging.getLogger(__name__)
 
+# Naive datetimes as UTC, numpy values natively, non-string keys stringified like json.dumps
+_ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
 class CacheManager:
     """Manages cache operations with Redis or in-memory fallback."""
     
     def __init__(self):
         self.redis_client = None
-        self.in_memory_cache = {}
-        self.cache_timestamps = {}
+        # key -> (value, expiry as time.monotonic_ns())
+        self.in_memory_cache: Dict[str, Tuple[Any, int]] = {}
+        # Min-heap of (expiry_ns, key); entries for overwritten keys are skipped on pop
+        self.expiry_heap: List[Tuple[int, str]] = []
         self.is_initialized = False
         self.use_redis = False
     
@@ -31,7 +37,8 @@ class CacheManager:
             try:
                 import redis.asyncio as redis
                 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-                self.redis_client = redis.from_url(redis_url, decode_responses=True)
+                # Values are orjson bytes, so responses are not decoded to str
+                self.redis_client = redis.from_url(redis_url, max_connections=50)
                 await self.redis_client.ping()
                 self.use_redis = True
                 logger.info("✅ Redis cache connected")
@@ -58,19 +65,17 @@ class CacheManager:
             if self.use_redis and self.redis_client:
                 value = await self.redis_client.get(key)
                 if value:
-                    return json.loads(value)
+                    return orjson.loads(value)
                 return None
             else:
                 # In-memory cache
-                if key in self.in_memory_cache:
-                    timestamp = self.cache_timestamps.get(key)
-                    if timestamp and datetime.now() < timestamp:
-                        return self.in_memory_cache[key]
-                    else:
-                        # Expired
-                        del self.in_memory_cache[key]
-                        if key in self.cache_timestamps:
-                            del self.cache_timestamps[key]
+                entry = self.in_memory_cache.get(key)
+                if entry is not None:
+                    value, expiry = entry
+                    if time.monotonic_ns() < expiry:
+                        return value
+                    # Expired
+                    del self.in_memory_cache[key]
                 return None
         except Exception as e:
             logger.error(f"Cache get error: {str(e)}")
@@ -83,16 +88,16 @@ class CacheManager:
         
         try:
             if self.use_redis and self.redis_client:
-                await self.redis_client.setex(key, ttl, json.dumps(value, default=str))
+                await self.redis_client.setex(key, ttl, orjson.dumps(value, default=str, option=_ORJSON_OPTIONS))
                 return True
             else:
                 # In-memory cache
-                self.in_memory_cache[key] = value
-                self.cache_timestamps[key] = datetime.now() + timedelta(seconds=ttl)
+                expiry = time.monotonic_ns() + ttl * 1_000_000_000
+                self.in_memory_cache[key] = (value, expiry)
+                heapq.heappush(self.expiry_heap, (expiry, key))
                 
-                # Clean old entries periodically
-                if len(self.in_memory_cache) > 1000:
-                    await self._cleanup_expired()
+                # Evict whatever has expired (only the expired heap heads are touched)
+                await self._cleanup_expired()
                     
                 return True
         except Exception as e:
@@ -101,14 +106,14 @@ class CacheManager:
     
     async def _cleanup_expired(self):
         """Clean expired entries from in-memory cache."""
-        now = datetime.now()
-        expired_keys = [
-            key for key, timestamp in self.cache_timestamps.items()
-            if timestamp < now
-        ]
-        for key in expired_keys:
-            self.in_memory_cache.pop(key, None)
-            self.cache_timestamps.pop(key, None)
+        now = time.monotonic_ns()
+        heap = self.expiry_heap
+        while heap and heap[0][0] < now:
+            expiry, key = heapq.heappop(heap)
+            entry = self.in_memory_cache.get(key)
+            # Skip heap entries left behind when the key was set again
+            if entry is not None and entry[1] == expiry:
+                del self.in_memory_cache[key]
     
     async def health_check(self) -> bool:
         """Check cache health."""
@@ -127,5 +132,5 @@ class CacheManager:
         if self.redis_client:
             await self.redis_client.close()
         self.in_memory_cache.clear()
-        self.cache_timestamps.clear()
+        self.expiry_heap.clear()
         logger.info("Cache connections closed")
\ No newline at end of file
@@ -7,13 +7,44 @@ Handles connections to MongoDB and data access for matching service.
 
 import logging
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union, AsyncIterator
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 import os
 
 logger = logging.getLogger(__name__)
 
+# Fields the matching engines read from a user document
+USER_PROJECTION = {
+    "_id": 1,
+    "first_name": 1,
+    "last_name": 1,
+    "phone": 1,
+    "email": 1,
+    "date_of_birth": 1,
+    "gender": 1,
+    "location": 1,
+    "profession": 1,
+    "interests": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+# Only the fields the matching engine scores on (no contact details)
+MATCHING_PROJECTION = {
+    field: 1 for field in USER_PROJECTION if field not in ("phone", "email")
+}
+
+# A user _id as a hex string, raw 12-byte BSON value, or ObjectId
+UserId = Union[str, bytes, ObjectId]
+
+def as_object_id(user_id: UserId) -> ObjectId:
+    """ObjectId for a user id, parsing hex only when given a string"""
+    if isinstance(user_id, ObjectId):
+        return user_id
+    # 12-byte values are taken as-is by the bson constructor, with no hex validation
+    return ObjectId(user_id)
+
 class DatabaseManager:
     """Manages database connections and user data operations."""
     
@@ -22,18 +53,27 @@ class DatabaseManager:
         self.mongo_db = None
         self.users_collection = None
         self.is_initialized = False
+        self.cursor_batch_size = 1000
+        # Random server-side sample of match candidates (None = all candidates)
+        self.candidate_sample_size: Optional[int] = None
     
     async def initialize(self):
         """Initialize database connections."""
         try:
             # Use same MongoDB URI as backend
             mongo_url = os.getenv("MONGODB_URI", "mongodb://localhost:27017/yofam-dev")
-            self.mongo_client = AsyncIOMotorClient(mongo_url)
+            self.mongo_client = AsyncIOMotorClient(
+                mongo_url,
+                maxPoolSize=100,
+                minPoolSize=10,
+                serverSelectionTimeoutMS=2000
+            )
             
             # Get database name from URI
             db_name = mongo_url.split('/')[-1] if '/' in mongo_url else 'yofam'
             self.mongo_db = self.mongo_client[db_name]
             self.users_collection = self.mongo_db.users
+            self.candidate_sample_size = int(os.getenv("MATCH_CANDIDATE_SAMPLE_SIZE", "0")) or None
             
             # Test MongoDB connection
             await self.mongo_client.admin.command('ping')
@@ -45,53 +85,55 @@ class DatabaseManager:
             logger.error(f"Database initialization failed: {str(e)}")
             raise
     
-    async def get_all_users(self) -> List[Dict[str, Any]]:
-        """Get all active users from the database"""
+    def _active_users_query(self, exclude_user_id: Optional[UserId] = None) -> Dict[str, Any]:
+        """Filter for active users with a name (served by the is_active/first_name/last_name index)"""
+        query = {
+            "is_active": True,
+            "first_name": {"$exists": True, "$ne": None},
+            "last_name": {"$exists": True, "$ne": None}
+        }
+        if exclude_user_id is not None:
+            query["_id"] = {"$ne": as_object_id(exclude_user_id)}
+        return query
+    
+    async def iter_matching_candidates(
+        self,
+        exclude_user_id: Optional[UserId] = None,
+        sample_size: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream active users with only the matching fields, optionally a random server-side sample"""
+        pipeline: List[Dict[str, Any]] = [{"$match": self._active_users_query(exclude_user_id)}]
+        if sample_size:
+            pipeline.append({"$sample": {"size": sample_size}})
+        pipeline.append({"$project": MATCHING_PROJECTION})
+        
+        cursor = self.users_collection.aggregate(pipeline, batchSize=self.cursor_batch_size)
+        async for user in cursor:
+            yield user
+    
+    async def get_matching_candidates(
+        self,
+        exclude_user_id: Optional[UserId] = None,
+        sample_size: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """All matching candidates at once, for scoring that blocks and ranks over the full set"""
         try:
-            users_cursor = self.users_collection.find({
-                "is_active": True,
-                "first_name": {"$exists": True, "$ne": None},
-                "last_name": {"$exists": True, "$ne": None}
-            }, {
-                "_id": 1,
-                "first_name": 1,
-                "last_name": 1,
-                "phone": 1,
-                "email": 1,
-                "date_of_birth": 1,
-                "gender": 1,
-                "location": 1,
-                "profession": 1,
-                "interests": 1,
-                "created_at": 1
-            })
-            
-            users = await users_cursor.to_list(length=None)
-            logger.info(f"📊 Retrieved {len(users)} active users from database")
-            return users
+            return [user async for user in self.iter_matching_candidates(exclude_user_id, sample_size)]
             
         except Exception as e:
-            logger.error(f"❌ Failed to get users: {e}")
+            logger.error(f"❌ Failed to get matching candidates: {e}")
             return []
     
-    async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+    async def count_active_users(self) -> int:
+        """Count active users server-side without fetching them"""
+        return await self.users_collection.count_documents(self._active_users_query())
+    
+    async def get_user_by_id(self, user_id: UserId) -> Optional[Dict[str, Any]]:
         """Get a specific user by ID"""
         try:
             user = await self.users_collection.find_one(
-                {"_id": ObjectId(user_id), "is_active": True},
-                {
-                    "_id": 1,
-                    "first_name": 1,
-                    "last_name": 1,
-                    "phone": 1,
-                    "email": 1,
-                    "date_of_birth": 1,
-                    "gender": 1,
-                    "location": 1,
-                    "profession": 1,
-                    "interests": 1,
-                    "created_at": 1
-                }
+                {"_id": as_object_id(user_id), "is_active": True},
+                USER_PROJECTION
             )
             return user
             
@@ -99,35 +141,6 @@ class DatabaseManager:
             logger.error(f"❌ Failed to get user {user_id}: {e}")
             return None
     
-    async def get_users_excluding(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all active users except the specified one"""
-        try:
-            users_cursor = self.users_collection.find({
-                "_id": {"$ne": ObjectId(user_id)},
-                "is_active": True,
-                "first_name": {"$exists": True, "$ne": None},
-                "last_name": {"$exists": True, "$ne": None}
-            }, {
-                "_id": 1,
-                "first_name": 1,
-                "last_name": 1,
-                "phone": 1,
-                "email": 1,
-                "date_of_birth": 1,
-                "gender": 1,
-                "location": 1,
-                "profession": 1,
-                "interests": 1,
-                "created_at": 1
-            })
-            
-            users = await users_cursor.to_list(length=None)
-            return users
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to get users excluding {user_id}: {e}")
-            return []
-    
     async def health_check(self) -> bool:
         """Check database health."""
         try:
@@ -5,18 +5,65 @@ Monitoring and Metrics Collection
 Collects and exports metrics for the AI matching service.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any
+from collections import deque
+from typing import Dict, Any, Optional
+
+from prometheus_client import Counter
 
 logger = logging.getLogger(__name__)
 
+MATCHING_EVENTS = Counter('matching_events_total', 'Total recorded matching events')
+MATCHES_FOUND = Counter('matches_total', 'Total matches returned by recorded matching events')
+
 class MetricsCollector:
     """Collects performance metrics."""
     
-    def __init__(self):
-        self.metrics = []
+    def __init__(self, flush_interval: float = 10.0):
+        # Bounded buffer of events not yet flushed; oldest events drop first if flushing falls behind
+        self.metrics = deque(maxlen=10000)
+        self.flush_interval = flush_interval
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    async def initialize(self):
+        """Start the background flush loop."""
+        self._flush_task = asyncio.create_task(self.flush_loop())
     
     async def record_matching_event(self, event_data: Dict[str, Any]):
         """Record a matching event."""
         self.metrics.append(event_data)
-        logger.info(f"Recorded matching event: {event_data['user_id']}")
\ No newline at end of file
+        logger.debug("Recorded matching event: %s", event_data['user_id'])
+    
+    def flush(self) -> int:
+        """Drain buffered events into the Prometheus counters."""
+        batch = []
+        while self.metrics:
+            batch.append(self.metrics.popleft())
+        
+        if batch:
+            MATCHING_EVENTS.inc(len(batch))
+            MATCHES_FOUND.inc(sum(event.get('match_count', 0) for event in batch))
+        return len(batch)
+    
+    async def flush_loop(self):
+        """Flush buffered events every flush_interval seconds."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                flushed = self.flush()
+                if flushed:
+                    logger.info(f"Flushed {flushed} matching events")
+            except Exception as e:
+                logger.error(f"Metrics flush error: {str(e)}")
+    
+    async def close(self):
+        """Stop the flush loop and flush whatever is left."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self.flush()
@@ -325,6 +325,7 @@ userSchema.index({ suspended: 1, isActive: 1 }); // Account status
 
 // Compound indexes for common search combinations
 userSchema.index({ is_active: 1, suspended: 1, last_activity: -1 }); // Active users by activity
+userSchema.index({ is_active: 1, first_name: 1, last_name: 1 }); // AI matching candidate scan
 userSchema.index({ profession: 1, location: 1 }); // Profession + location filter
 userSchema.index({ interests: 1, location: 1 }); // Interests + location filter
 